@@ -1,13 +1,22 @@
-from flask import Flask, render_template_string, request
-import requests
-import json
+from quart import Quart, Response, request
+from jinja2 import Environment
+import asyncio
+import gzip
+import hashlib
+import httpx
+import orjson
+import os
+import re
 
-app = Flask(__name__)
+app = Quart(__name__)
 
 # URL API of the MCP server  
 MCP_API_URL = "http://127.0.0.1:5050"
 
-# Note: Make sure to run mcp_server_clean.py before using this app
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = 1024
+
+# Note: Make sure to run mcp_server.py before using this app
 
 HTML = """
 <!DOCTYPE html>
@@ -150,6 +159,12 @@ HTML = """
             <pre>{{ answer }}</pre>
         </div>
         {% endif %}
+
+        <div class="error" id="streamError" style="display: none;"></div>
+        <div class="result" id="streamResult" style="display: none;">
+            <h2>📊 Kết quả giải bài toán:</h2>
+            <pre id="streamOutput"></pre>
+        </div>
         
         <div class="example">
             <h3>💡 Ví dụ về bài toán tối ưu hóa:</h3>
@@ -164,49 +179,200 @@ HTML = """
     </div>
 
     <script>
-        // Form submission handling
-        document.getElementById('problemForm').addEventListener('submit', function() {
-            document.getElementById('submitBtn').disabled = true;
-            document.getElementById('submitBtn').textContent = '⏳ Đang xử lý...';
+        // Show one Server-Sent Event from /stream
+        function handleEvent(raw) {
+            let event = 'message';
+            let data = '';
+            raw.split('\\n').forEach(function(line) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (event === 'output') {
+                document.getElementById('streamResult').style.display = 'block';
+                document.getElementById('streamOutput').textContent += JSON.parse(data);
+            } else if (event === 'error') {
+                const errorBox = document.getElementById('streamError');
+                errorBox.textContent = '❌ Lỗi: ' + JSON.parse(data);
+                errorBox.style.display = 'block';
+            }
+        }
+
+        // Form submission handling: stream the answer while the agent works, or fall back to a normal POST
+        document.getElementById('problemForm').addEventListener('submit', async function(e) {
+            const submitBtn = document.getElementById('submitBtn');
+            submitBtn.disabled = true;
+            submitBtn.textContent = '⏳ Đang xử lý...';
             document.getElementById('loading').style.display = 'block';
+            if (!window.fetch || !window.TextDecoder || !window.ReadableStream) return;
+
+            e.preventDefault();
+            document.querySelectorAll('.result, .error').forEach(function(box) { box.style.display = 'none'; });
+            document.getElementById('streamOutput').textContent = '';
+            try {
+                const response = await fetch('/stream', {method: 'POST', body: new URLSearchParams(new FormData(this))});
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                while (true) {
+                    const {value, done} = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, {stream: true});
+                    let end;
+                    while ((end = buffer.indexOf('\\n\\n')) !== -1) {
+                        handleEvent(buffer.slice(0, end));
+                        buffer = buffer.slice(end + 2);
+                    }
+                }
+            } catch (err) {
+                handleEvent('event: error\\ndata: ' + JSON.stringify(String(err)));
+            } finally {
+                submitBtn.disabled = false;
+                submitBtn.textContent = '🚀 Giải quyết bài toán';
+                document.getElementById('loading').style.display = 'none';
+            }
         });
     </script>
 </body>
 </html>
 """
 
+# Drop the whitespace between tags once at import
+HTML = re.sub(r'>\s+<', '><', HTML)
+
+# Compile the template once instead of re-parsing it on every request
+TEMPLATE = Environment(autoescape=True).from_string(HTML)
+# The GET page has no user data, so it is rendered (and compressed) only once
+EMPTY_PAGE = TEMPLATE.render(question="", answer="", error="")
+EMPTY_PAGE_GZIP = gzip.compress(EMPTY_PAGE.encode("utf-8"), 6)
+# Validators for the GET page; the gzip representation needs its own strong ETag
+EMPTY_PAGE_ETAG = '"' + hashlib.sha256(EMPTY_PAGE.encode("utf-8")).hexdigest()[:16] + '"'
+EMPTY_PAGE_GZIP_ETAG = EMPTY_PAGE_ETAG[:-1] + '-gzip"'
+EMPTY_PAGE_CACHE_CONTROL = "public, max-age=300"
+
+def accepts_gzip():
+    return "gzip" in request.headers.get("Accept-Encoding", "")
+
+@app.before_serving
+async def create_http_client():
+    # Shared async HTTP client so every form submission reuses a keep-alive connection to the MCP server
+    app.http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        headers={'Content-Type': 'application/json'}
+    )
+
+@app.after_serving
+async def close_http_client():
+    await app.http_client.aclose()
+
+def build_payload(question):
+    # JSON-RPC 2.0 format for FastMCP
+    return {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {
+            "name": "get_operation_research_problem_answer",
+            "arguments": {
+                "user_question": question
+            }
+        },
+        "id": 1
+    }
+
+def sse_error(message):
+    return b"event: error\ndata: " + orjson.dumps(message) + b"\n\n"
+
+def sse_from_json(body):
+    """Convert a plain JSON-RPC reply into the events the page expects."""
+    reply = orjson.loads(body)
+    if isinstance(reply, dict) and isinstance(reply.get("error"), dict):
+        return sse_error(str(reply["error"].get("message", reply["error"])))
+    answer = str(reply["result"]) if isinstance(reply, dict) and "result" in reply else str(reply)
+    return (b"event: output\ndata: " + orjson.dumps(answer) + b"\n\n"
+            + b"event: done\ndata: " + orjson.dumps({"id": reply.get("id") if isinstance(reply, dict) else None}) + b"\n\n")
+
+@app.route("/stream", methods=["POST"])
+async def stream():
+    """Relay the MCP server's Server-Sent Events so the page can show the agent output as it arrives."""
+    form = await request.form
+    question = form.get("question", "").strip()
+
+    async def relay():
+        if not question:
+            yield sse_error("Vui lòng nhập câu hỏi tối ưu hóa")
+            return
+        try:
+            async with app.http_client.stream(
+                "POST",
+                MCP_API_URL,
+                content=orjson.dumps(build_payload(question)),
+                headers={'Accept': 'text/event-stream'},
+                timeout=120
+            ) as response:
+                if response.status_code != 200:
+                    yield sse_error(f"Server error: {response.status_code}")
+                    return
+                if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                    # An older server, or a reply it sends without streaming
+                    yield sse_from_json(await response.aread())
+                    return
+                async for chunk in response.aiter_raw():
+                    yield chunk
+        except httpx.TimeoutException:
+            yield sse_error("Timeout: Bài toán quá phức tạp, vui lòng thử lại")
+        except httpx.ConnectError:
+            yield sse_error("Không thể kết nối tới MCP server")
+        except Exception as e:
+            yield sse_error(f"Lỗi: {str(e)}")
+
+    response = Response(relay(), status=200, headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    # Agent runs outlast Quart's default RESPONSE_TIMEOUT (60 s); the upstream request has its own 120 s timeout
+    response.timeout = None
+    return response
+
+@app.after_request
+async def compress_response(response):
+    """Gzip HTML pages for clients that accept it."""
+    if (response.mimetype != "text/html" or "Content-Encoding" in response.headers
+            or not accepts_gzip()):
+        return response
+    data = await response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, 6))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
 @app.route("/", methods=["GET", "POST"])
-def index():
+async def index():
+    if request.method == "GET":
+        use_gzip = accepts_gzip()
+        etag = EMPTY_PAGE_GZIP_ETAG if use_gzip else EMPTY_PAGE_ETAG
+        headers = {"Cache-Control": EMPTY_PAGE_CACHE_CONTROL, "ETag": etag, "Vary": "Accept-Encoding"}
+        if etag in (tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")):
+            return Response(b"", status=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(EMPTY_PAGE_GZIP, content_type="text/html; charset=utf-8", headers=headers)
+        return Response(EMPTY_PAGE, content_type="text/html; charset=utf-8", headers=headers)
+
     question = ""
     answer = ""
     error = ""
     
     if request.method == "POST":
-        question = request.form.get("question", "").strip()
+        form = await request.form
+        question = form.get("question", "").strip()
         if question:
             try:
-                # JSON-RPC 2.0 format for FastMCP
-                payload = {
-                    "jsonrpc": "2.0",
-                    "method": "tools/call",
-                    "params": {
-                        "name": "get_operation_research_problem_answer",
-                        "arguments": {
-                            "user_question": question
-                        }
-                    },
-                    "id": 1
-                }
-                
-                response = requests.post(
+                response = await app.http_client.post(
                     MCP_API_URL,
-                    json=payload,
-                    headers={'Content-Type': 'application/json'},
+                    content=orjson.dumps(build_payload(question)),
                     timeout=120
                 )
                 
                 if response.status_code == 200:
-                    result = response.json()
+                    result = orjson.loads(response.content)
                     if 'result' in result:
                         answer = str(result['result'])
                     else:
@@ -214,21 +380,31 @@ def index():
                 else:
                     error = f"Server error: {response.status_code}"
                     
-            except requests.exceptions.Timeout:
+            except httpx.TimeoutException:
                 error = "Timeout: Bài toán quá phức tạp, vui lòng thử lại"
-            except requests.exceptions.ConnectionError:
+            except httpx.ConnectError:
                 error = "Không thể kết nối tới MCP server"
             except Exception as e:
                 error = f"Lỗi: {str(e)}"
         else:
             error = "Vui lòng nhập câu hỏi tối ưu hóa"
     
-    return render_template_string(HTML, question=question, answer=answer, error=error)
+    return TEMPLATE.render(question=question, answer=answer, error=error)
 
 if __name__ == "__main__":
-    print("🌐 Starting Flask web server...")
+    print("🌐 Starting Quart web server...")
     print("📍 Web interface: http://127.0.0.1:5000")
     print("📡 MCP Server URL:", MCP_API_URL)
     print("\n⚠️  Make sure MCP server is running first!")
     
-    app.run(host="127.0.0.1", port=5000, debug=True)
+    if os.getenv("QUART_DEBUG"):
+        # Development server with auto-reload
+        app.run(host="127.0.0.1", port=5000, debug=True)
+    else:
+        # For several worker processes use: hypercorn app:app --workers 4 --worker-class asyncio --bind 127.0.0.1:5000
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        config = Config()
+        config.bind = ["127.0.0.1:5000"]
+        asyncio.run(serve(app, config))
@@ -1,50 +1,23 @@
-import openai
-import anthropic
-import google.generativeai as genai
 from dotenv import load_dotenv
+import asyncio
+import io
 import os
-import json
 import argparse
+import ijson
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from src.modules import utils
 from src.modules.utils import (
     or_llm_agent,
     gpt_code_agent_simple,
-    eval_model_result
+    eval_model_result,
+    capture_stdout
 )
 
 # Load environment variables from .env file
+# (the LLM clients, with their shared connection pool, live in src.modules.utils)
 load_dotenv()
 
-# Anthropic API setup
-anthropic_api_data = dict(
-    api_key = os.getenv("CLAUDE_API_KEY"),
-)
-anthropic_client = anthropic.Anthropic(
-    api_key=anthropic_api_data["api_key"]
-)
-
-# Ollama API setup
-ollama_api_data = dict(
-    base_url = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
-)
-
-# OpenAI API setup
-openai_api_data = dict(
-    api_key = os.getenv("OPENAI_API_KEY"),
-    base_url = os.getenv("OPENAI_API_BASE")
-)  
-openai_client = openai.OpenAI(
-    api_key=openai_api_data["api_key"],
-    base_url=openai_api_data["base_url"] if openai_api_data["base_url"] else None
-)
-
-# Gemini API setup
-gemini_api_data = dict(
-    api_key = os.getenv("GEMINI_API_KEY"),
-)
-genai.configure(
-    api_key=gemini_api_data["api_key"]
-)
-
 def parse_args():
     """
     Parse command line arguments.
@@ -59,30 +32,30 @@ def parse_args():
                         help='Model name to use for LLM queries. Use "claude-..." for Claude models or "ollama:..." for Ollama models.')
     parser.add_argument('--data_path', type=str, default='data/datasets/dataset_combined_result.json',
                         help='Path to the dataset JSON file')
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('EVAL_CONCURRENCY', '8')),
+                        help='Number of problems solved in parallel (default: $EVAL_CONCURRENCY or 8)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore results and LLM completions cached by earlier runs, so every problem is solved again')
     return parser.parse_args()
 
-if __name__ == "__main__":
-    args = parse_args()
-    
-    with open(args.data_path, 'r') as f:
-        dataset = json.load(f)
-    #print(dataset['0'])
-
-    model_name = args.model
+def solve_one(i, d, use_agent, model_name, use_cache=True):
+    """
+    Solve and evaluate one dataset entry, capturing everything it prints.
 
-    pass_count = 0
-    correct_count = 0
-    error_datas = []
-    for i, d in dataset.items():
+    Returns:
+        tuple: (log: str, pass_flag: bool, correct_flag: bool)
+    """
+    buffer = io.StringIO()
+    with capture_stdout(buffer):
         print(f"=============== num {i} ==================")
         user_question, answer = d['question'], d['answer']
         print(user_question)
         print('-------------')
         
-        if args.agent:
-            is_solve_success, llm_result = or_llm_agent(user_question, model_name)
+        if use_agent:
+            is_solve_success, llm_result = or_llm_agent(user_question, model_name, use_cache=use_cache)
         else:
-            is_solve_success, llm_result = gpt_code_agent_simple(user_question, model_name)
+            is_solve_success, llm_result = gpt_code_agent_simple(user_question, model_name, use_cache=use_cache)
             
         if is_solve_success:
             print(f"Successfully executed code, optimal solution value: {llm_result}")
@@ -91,15 +64,65 @@ if __name__ == "__main__":
         print('------------------')
         pass_flag, correct_flag = eval_model_result(is_solve_success, llm_result, answer)
 
+        print(f'solve: {is_solve_success}, llm: {llm_result}, ground truth: {answer}')
+        print(f'[Final] run pass: {pass_flag}, solve correct: {correct_flag}')
+        print(' ')
+    return buffer.getvalue(), pass_flag, correct_flag
+
+async def run_eval(items, args):
+    """
+    Solve (index, entry) pairs with up to args.concurrency problems in flight.
+    Entries are pulled from items only when a slot is free, and logs are printed
+    in dataset order as soon as each problem is done.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency))
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def solve_and_release(i, d):
+        try:
+            return await asyncio.to_thread(solve_one, i, d, args.agent, args.model, not args.no_cache)
+        finally:
+            semaphore.release()
+
+    total = 0
+    pass_count = 0
+    correct_count = 0
+    error_datas = []
+
+    def report(i, task):
+        nonlocal pass_count, correct_count
+        log, pass_flag, correct_flag = task.result()
+        print(log, end='')
+
         pass_count += 1 if pass_flag else 0
         correct_count += 1 if correct_flag else 0
 
         if not pass_flag or not correct_flag:
             error_datas.append(i)
 
-        print(f'solve: {is_solve_success}, llm: {llm_result}, ground truth: {answer}')
-        print(f'[Final] run pass: {pass_flag}, solve correct: {correct_flag}')
-        print(' ')
+    pending = deque()
+    for i, d in items:
+        await semaphore.acquire()
+        pending.append((i, asyncio.create_task(solve_and_release(i, d))))
+        total += 1
+        while pending and pending[0][1].done():
+            report(*pending.popleft())
+
+    while pending:
+        i, task = pending.popleft()
+        await task
+        report(i, task)
             
-    print(f'[Total {len(dataset)}] run pass: {pass_count}, solve correct: {correct_count}')
+    print(f'[Total {total}] run pass: {pass_count}, solve correct: {correct_count}')
     print(f'[Total fails {len(error_datas)}] error datas: {error_datas}')
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.no_cache:
+        # Replayed completions would just re-execute the same code, so resample the LLM as well
+        utils.prompt_cache = None
+    
+    # Stream the dataset entry by entry instead of loading the whole file
+    with open(args.data_path, 'rb') as f:
+        asyncio.run(run_eval(ijson.kvitems(f, '', use_float=True), args))
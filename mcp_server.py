@@ -4,160 +4,616 @@ MCP Server for OR Agent
 A simplified HTTP server with JSON-RPC support for the Operations Research Agent.
 """
 
+import asyncio
+import hashlib
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
 from aiohttp import web
 import io
-from contextlib import redirect_stdout
-from src.modules.utils import or_llm_agent
+import orjson
+from src.modules.utils import or_llm_agent, http_client, capture_stdout, embed_text, llm_retry_stats
+from src.modules.cache import TTLCache, DiskCache, SemanticCache, cache_key, numeric_tokens
 from dotenv import load_dotenv
 load_dotenv()
 
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logging is configured in __main__, so importing this module has no side effects on the root logger
 logger = logging.getLogger(__name__)
 
 # Server configuration
 SERVER_NAME = "or_llm_agent"
 HOST = "127.0.0.1"
 PORT = 5050
+# OR problems are small; larger bodies are rejected before any parsing work
+MAX_BODY_SIZE = int(os.getenv("MAX_REQUEST_BODY_SIZE", str(1024 * 1024)))
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = 1024
 
 default_model = dict(
     model = os.getenv("DEFAULT_MODEL"),
 )
 DEFAULT_MODEL = default_model["model"]
 
+# Worker threads for agent runs; keep this small enough not to exhaust the LLM API quota
+AGENT_WORKERS = int(os.getenv("OR_AGENT_WORKERS", "8"))
+EXECUTOR = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix="or_agent")
+
+# In-process cache of tools/call answers, keyed on model name and normalized question
+rpc_cache_config = dict(
+    enabled = os.getenv("RPC_CACHE_ENABLED", "1") == "1",
+    ttl = int(os.getenv("RPC_CACHE_TTL", "300")),
+    max_entries = int(os.getenv("RPC_CACHE_MAX_ENTRIES", "10000")),
+)
+answer_cache = TTLCache(
+    maxsize=rpc_cache_config["max_entries"],
+    ttl=rpc_cache_config["ttl"]
+) if rpc_cache_config["enabled"] else None
+
+# Persistent cache of agent answers, kept across server restarts (delete OR_CACHE_DIR to invalidate)
+disk_cache_config = dict(
+    enabled = os.getenv("DISK_CACHE_ENABLED", "1") == "1",
+    directory = os.getenv("OR_CACHE_DIR", ".or_cache"),
+    ttl = int(os.getenv("DISK_CACHE_TTL", "86400")),
+)
+disk_cache = DiskCache(
+    os.path.join(disk_cache_config["directory"], "answers"),
+    ttl=disk_cache_config["ttl"]
+) if disk_cache_config["enabled"] else None
+
+# Embedding-similarity cache so paraphrased questions reuse earlier answers (needs an OpenAI API key)
+semantic_cache_config = dict(
+    enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "0") == "1",
+    model = os.getenv("SEMANTIC_CACHE_MODEL", "text-embedding-3-small"),
+    threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+)
+semantic_cache = SemanticCache(
+    lambda text: embed_text(text, semantic_cache_config["model"]),
+    threshold=semantic_cache_config["threshold"],
+    directory=os.path.join(disk_cache_config["directory"], "semantic")
+) if semantic_cache_config["enabled"] else None
+
+# Input limits for questions worth sending to the agent
+MIN_QUESTION_LENGTH = 20
+MAX_QUESTION_LENGTH = 32_000
+
+def direct_answer(user_question):
+    """
+    Return a canned reply for questions that are empty, oversized or clearly not
+    an optimization problem, so they never reach the LLM. Returns None otherwise.
+    """
+    question = user_question.strip() if isinstance(user_question, str) else ""
+    if not question:
+        return "Please enter a question."
+    if len(question) > MAX_QUESTION_LENGTH:
+        return f"Error: The question is too long (limit {MAX_QUESTION_LENGTH} characters)."
+    # OR problems always come with data; isnumeric() also accepts CJK numerals
+    if len(question) < MIN_QUESTION_LENGTH or not any(c.isnumeric() for c in question):
+        return ("The question doesn't look like an optimization problem. Please describe the decision variables, "
+                "the objective and the constraints, including their numbers.")
+    return None
+
 # Function to solve OR problems
 def get_operation_research_problem_answer(user_question, model_name=DEFAULT_MODEL, max_attempts=3):
     """Use the agent to solve the optimization problem."""
+    _, answer = solve_operation_research_problem(user_question, model_name, max_attempts)
+    return answer
+
+def solve_operation_research_problem(user_question, model_name=DEFAULT_MODEL, max_attempts=3, transcript=None):
+    """
+    Run the agent on an optimization problem, reusing answers from the disk cache.
+
+    Args:
+        transcript: Optional OutputTee that receives the agent output while it runs.
+                    Left empty when the answer comes from a cache.
+
+    Returns:
+        tuple: (cacheable: bool, answer: str). cacheable is False when the answer
+        is an error message rather than an agent transcript.
+    """
+    answer = direct_answer(user_question)
+    if answer is not None:
+        logger.info("Question answered directly without the agent")
+        return False, answer
+
+    if disk_cache is None:
+        return run_semantic_cached(user_question, model_name, max_attempts, transcript)
+
+    key = cache_key(model_name, user_question)
+    answer = disk_cache.get(key)
+    if answer is not None:
+        logger.info("Answer served from disk cache")
+        return True, answer
+
+    with disk_cache.lock(key):
+        # Another worker may have solved the same question while we waited for the lock
+        answer = disk_cache.get(key)
+        if answer is not None:
+            logger.info("Answer served from disk cache")
+            return True, answer
+
+        cacheable, answer = run_semantic_cached(user_question, model_name, max_attempts, transcript)
+        if cacheable:
+            disk_cache.set(key, answer)
+        return cacheable, answer
+
+def run_semantic_cached(user_question, model_name=DEFAULT_MODEL, max_attempts=3, transcript=None):
+    """Answer from the semantic cache when a similar question was already solved, else run the agent."""
+    if semantic_cache is None:
+        return run_agent(user_question, model_name, max_attempts, transcript)
+
     try:
-        logger.info(f"Processing OR problem: {user_question[:50]}...")
+        vector = semantic_cache.encode(user_question)
+    except Exception as e:
+        logger.error("Embedding failed, skipping semantic cache: %s", e)
+        return run_agent(user_question, model_name, max_attempts, transcript)
+
+    numbers = numeric_tokens(user_question)
+    answer = semantic_cache.search(vector, namespace=model_name, numbers=numbers)
+    if answer is not None:
+        logger.info("Answer served from semantic cache")
+        return True, answer
+
+    cacheable, answer = run_agent(user_question, model_name, max_attempts, transcript)
+    if cacheable:
+        semantic_cache.add(vector, answer, namespace=model_name, numbers=numbers)
+    return cacheable, answer
+
+class OutputTee:
+    """
+    Writable sink keeping the agent transcript as a list of line-sized pieces,
+    so streaming readers can follow it by position without copying it. Calls
+    on_lines (from the writing thread) whenever complete lines were added.
+    """
+
+    def __init__(self, on_lines):
+        self.lines = []
+        self._partial = ""
+        self.on_lines = on_lines
+
+    def write(self, s):
+        if "\n" not in s:
+            # print() writes its arguments, separators and end as separate calls
+            self._partial += s
+            return
+        complete, _, self._partial = (self._partial + s).rpartition("\n")
+        self.lines.append(complete + "\n")
+        self.on_lines()
+
+    def flush(self):
+        """Publish a trailing unterminated line."""
+        if self._partial:
+            self.lines.append(self._partial)
+            self._partial = ""
+            self.on_lines()
+
+    def getvalue(self):
+        return "".join(self.lines) + self._partial
+
+def run_agent(user_question, model_name=DEFAULT_MODEL, max_attempts=3, transcript=None):
+    """Run or_llm_agent and capture its transcript, see solve_operation_research_problem."""
+    try:
+        logger.info("Processing OR problem: %s...", user_question[:50])
         
         # Try to solve the problem with the real agent
-        buffer = io.StringIO()
-        with redirect_stdout(buffer):
-            result = or_llm_agent(user_question, model_name, max_attempts)
+        buffer = io.StringIO() if transcript is None else transcript
+        with capture_stdout(buffer):
+            # The server caches whole transcripts itself, the agent's bare result cache would drop the log
+            result = or_llm_agent(user_question, model_name, max_attempts, use_cache=False)
+        buffer.flush()
         output = buffer.getvalue()
         
         # Kiểm tra kết quả trước khi unpack
         if result is None:
             logger.error("or_llm_agent returned None")
-            return "Error: The OR agent failed to process your question. Please check if your question describes a clear optimization problem."
+            return False, "Error: The OR agent failed to process your question. Please check if your question describes a clear optimization problem."
         
         # Kiểm tra xem result có phải tuple không
         if isinstance(result, tuple) and len(result) == 2:
             is_solve_success, solution = result
-            logger.info(f"OR problem processed successfully: {is_solve_success}")
+            logger.info("OR problem processed successfully: %s", is_solve_success)
         else:
             # Nếu không phải tuple, coi như thành công và dùng result trực tiếp
             is_solve_success = True
             logger.info("OR problem processed (non-tuple result)")
         
         if not output.strip():
-            return "No output generated from the OR agent. Please check your question format."
+            return False, "No output generated from the OR agent. Please check your question format."
         
-        return output
+        return True, output
         
     except Exception as e:
-        logger.error(f"Error in get_operation_research_problem_answer: {str(e)}")
+        logger.error("Error in run_agent: %s", e)
         
         # Check for common errors
         error_message = str(e)
         if "API key" in error_message:
-            return "Error: Invalid API key. Please check your .env file and ensure the API key is correctly set."
+            return False, "Error: Invalid API key. Please check your .env file and ensure the API key is correctly set."
         elif "model_not_found" in error_message or "does not exist" in error_message:
-            return f"Error: Model '{model_name}' not found or you don't have access to it. Try using a different model."
+            return False, f"Error: Model '{model_name}' not found or you don't have access to it. Try using a different model."
         elif "quota" in error_message or "exceeded" in error_message:
-            return "Error: API rate limit exceeded or insufficient quota. Please check your billing details or try again later."
+            return False, "Error: API rate limit exceeded or insufficient quota. Please check your billing details or try again later."
         elif "cannot unpack" in error_message:
-            return "Error: The OR agent returned an unexpected result format. Please check your or_llm_agent implementation."
+            return False, "Error: The OR agent returned an unexpected result format. Please check your or_llm_agent implementation."
         else:
-            return f"Error processing the optimization problem: {error_message}"
+            return False, f"Error processing the optimization problem: {error_message}"
+
+class InflightRun:
+    """
+    One agent run in progress. Its transcript is the only copy of the output;
+    streaming clients read it from their own position as it grows.
+    """
+
+    def __init__(self, loop):
+        self.future = None
+        self._waiters = []
+        # Worker thread -> event loop wake-up, once per batch of complete lines
+        self.transcript = OutputTee(lambda: loop.call_soon_threadsafe(self.notify))
+
+    def notify(self, _=None):
+        """Wake every reader waiting for output. Runs on the event loop."""
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    async def wait(self):
+        """Wait until more output was written or the run finished."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        await waiter
+
+# Agent runs in progress, keyed like the answer cache; identical concurrent requests, streamed or not, share one run
+INFLIGHT = {}
+
+def start_run(key, user_question, model_name=DEFAULT_MODEL, max_attempts=3):
+    """Return the in-flight run for key, starting a new agent run if there is none."""
+    # No await between the lookup and the insert, so this is race-free on the event loop
+    run = INFLIGHT.get(key)
+    if run is not None:
+        logger.info("Joining in-flight agent run")
+        return run
+
+    run = InflightRun(asyncio.get_running_loop())
+    run.future = asyncio.ensure_future(solve_and_cache(key, user_question, model_name, max_attempts, run.transcript))
+    INFLIGHT[key] = run
+    run.future.add_done_callback(lambda _: INFLIGHT.pop(key, None))
+    run.future.add_done_callback(run.notify)
+    return run
+
+async def answer_question(user_question, model_name=DEFAULT_MODEL, max_attempts=3):
+    """Answer from the cache, by joining an identical in-flight run, or by starting a new agent run."""
+    key = cache_key(model_name, user_question)
+    if answer_cache is not None:
+        answer = answer_cache.get(key)
+        if answer is not None:
+            logger.info("Answer served from cache")
+            return answer
+
+    run = start_run(key, user_question, model_name, max_attempts)
+    # A disconnecting client must not cancel the run for the other waiters
+    cacheable, answer = await asyncio.shield(run.future)
+    return answer
+
+async def solve_and_cache(key, user_question, model_name=DEFAULT_MODEL, max_attempts=3, transcript=None):
+    """Run the agent and store a cacheable answer in the memory cache. Returns (cacheable, answer)."""
+    # Run the blocking agent off the event loop so other requests are still served
+    loop = asyncio.get_running_loop()
+    cacheable, answer = await loop.run_in_executor(
+        EXECUTOR, solve_operation_research_problem, user_question, model_name, max_attempts, transcript
+    )
+    if cacheable and answer_cache is not None:
+        answer_cache.set(key, answer)
+    return cacheable, answer
 
 # Function for health check
 def health_check():
     """Simple health check to verify the server is running."""
     return "MCP Server is running and healthy!"
 
+# Tools advertised by tools/list
+TOOLS = [
+    {
+        "name": "get_operation_research_problem_answer",
+        "description": "Use the agent to solve the optimization problem",
+        "parameters": {
+            "user_question": {"type": "string", "description": "The user's question"},
+            "model_name": {"type": "string", "description": "LLM model name to use"},
+            "max_attempts": {"type": "integer", "description": "Maximum number of attempts"}
+        }
+    },
+    {
+        "name": "health_check",
+        "description": "Simple health check to verify the server is running",
+        "parameters": {}
+    }
+]
+
+def serialize_static_result(result):
+    """
+    Serialize a constant JSON-RPC result once, as (prefix, suffix) bytes around the request id.
+    """
+    return orjson.dumps({"jsonrpc": "2.0", "result": result})[:-1] + b',"id":', b"}"
+
+# Responses whose result never changes are encoded once at import; only the id is filled in per request
+PING_RESPONSE = serialize_static_result("pong")
+TOOLS_LIST_RESPONSE = serialize_static_result(TOOLS)
+HEALTH_CHECK_RESPONSE = serialize_static_result(health_check())
+
+def static_response(template, request_id):
+    """Build a JSON-RPC response from a pre-serialized template and the request id."""
+    prefix, suffix = template
+    return web.Response(body=prefix + orjson.dumps(request_id) + suffix, content_type="application/json")
+
+def json_response(data, status=200):
+    """Encode a response body with orjson, which is several times faster than the stdlib json module."""
+    return web.Response(body=orjson.dumps(data), status=status, content_type="application/json")
+
+def sse_event(event, data):
+    """Encode one Server-Sent Event whose data is JSON."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+def sse_response(body):
+    """Complete Server-Sent Events reply for an answer that is known up front."""
+    return web.Response(body=body, content_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def stream_answer(request, request_id, user_question, model_name=DEFAULT_MODEL, max_attempts=3):
+    """
+    Answer tools/call as Server-Sent Events, sending agent output while it is produced.
+
+    Events: "output" (a chunk of the transcript), then either "done" or "error" (the error message).
+    """
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+
+    key = cache_key(model_name, user_question)
+    answer = answer_cache.get(key) if answer_cache is not None else None
+    if answer is not None:
+        logger.info("Answer served from cache")
+        await response.write(sse_event("output", answer))
+        await response.write(sse_event("done", {"id": request_id, "cached": True}))
+        await response.write_eof()
+        return response
+
+    run = start_run(key, user_question, model_name, max_attempts)
+    lines = run.transcript.lines
+
+    streamed = False
+    position = 0
+    try:
+        while True:
+            # Checked first: once the run is done, every line is already in the transcript
+            finished = run.future.done()
+            end = len(lines)
+            if end > position:
+                # Everything written since the last event goes out as one event
+                await response.write(sse_event("output", "".join(lines[position:end])))
+                position = end
+                streamed = True
+            if finished:
+                break
+            await run.wait()
+
+        # The headers are already sent, so a failed run is reported as an event rather than a JSON-RPC error
+        try:
+            cacheable, answer = await asyncio.shield(run.future)
+        except Exception as e:
+            logger.error("Error in streamed agent run: %s", e)
+            cacheable, answer = False, f"Internal error: {str(e)}"
+
+        if not cacheable:
+            await response.write(sse_event("error", answer))
+        else:
+            if not streamed:
+                # Served from the disk or semantic cache
+                await response.write(sse_event("output", answer))
+            await response.write(sse_event("done", {"id": request_id, "cached": not streamed}))
+        await response.write_eof()
+    except ConnectionResetError:
+        # The client went away; the run still finishes in the background and fills the caches
+        logger.info("Streaming client disconnected")
+    return response
+
+@dataclass(slots=True)
+class JsonRpcRequest:
+    """JSON-RPC 2.0 request, validated once right after decoding."""
+    method: str
+    params: dict
+    id: Any = None
+
+    @classmethod
+    def parse(cls, data):
+        """Return the request, or None if data is not a valid request object."""
+        if not isinstance(data, dict):
+            return None
+        method = data.get("method")
+        params = data.get("params", {})
+        if not isinstance(method, str) or not isinstance(params, dict):
+            return None
+        return cls(method, params, data.get("id"))
+
+@dataclass(slots=True)
+class SolveArguments:
+    """Arguments of the get_operation_research_problem_answer tool."""
+    user_question: str
+    model_name: Optional[str] = DEFAULT_MODEL
+    max_attempts: int = 3
+
+    @classmethod
+    def parse(cls, arguments):
+        """Return the arguments, or None if they have the wrong types."""
+        if not isinstance(arguments, dict):
+            return None
+        user_question = arguments.get("user_question", "")
+        model_name = arguments.get("model_name", DEFAULT_MODEL)
+        max_attempts = arguments.get("max_attempts", 3)
+        if (not isinstance(user_question, str)
+                or not (model_name is None or isinstance(model_name, str))
+                or isinstance(max_attempts, bool) or not isinstance(max_attempts, int) or max_attempts < 1):
+            return None
+        return cls(user_question, model_name, max_attempts)
+
+def error_response(code, message, request_id=None, stream=False):
+    """JSON-RPC error, or a single "error" event when the client asked for Server-Sent Events."""
+    if stream:
+        return sse_response(sse_event("error", message))
+    return json_response({"jsonrpc": "2.0", "error": {"code": code, "message": message}, "id": request_id})
+
 # JSON-RPC handler
 async def handle_jsonrpc(request):
+    if request.content_length is not None and request.content_length > MAX_BODY_SIZE:
+        return web.Response(status=413, text="Request body too large")
     try:
-        data = await request.json()
-        
-        if data.get("method") == "ping":
-            return web.json_response({"jsonrpc": "2.0", "result": "pong", "id": data.get("id")})
+        raw = await request.read()
+    except web.HTTPRequestEntityTooLarge:
+        return web.Response(status=413, text="Request body too large")
+
+    # Streaming clients get every tool reply, errors included, as events
+    stream = "text/event-stream" in request.headers.get("Accept", "")
+    try:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return error_response(-32700, "Parse error", stream=stream)
+    rpc = JsonRpcRequest.parse(data)
+    if rpc is None:
+        return error_response(-32600, "Invalid Request", data.get("id") if isinstance(data, dict) else None, stream)
+
+    try:
+        if rpc.method == "ping":
+            return static_response(PING_RESPONSE, rpc.id)
         
-        if data.get("method") == "tools/list":
-            tools = [
-                {
-                    "name": "get_operation_research_problem_answer",
-                    "description": "Use the agent to solve the optimization problem",
-                    "parameters": {
-                        "user_question": {"type": "string", "description": "The user's question"},
-                        "model_name": {"type": "string", "description": "LLM model name to use"},
-                        "max_attempts": {"type": "integer", "description": "Maximum number of attempts"}
-                    }
-                },
-                {
-                    "name": "health_check",
-                    "description": "Simple health check to verify the server is running",
-                    "parameters": {}
-                }
-            ]
-            return web.json_response({"jsonrpc": "2.0", "result": tools, "id": data.get("id")})
+        if rpc.method == "tools/list":
+            return static_response(TOOLS_LIST_RESPONSE, rpc.id)
         
-        if data.get("method") == "tools/call":
-            params = data.get("params", {})
-            tool_name = params.get("name")
-            arguments = params.get("arguments", {})
+        if rpc.method == "tools/call":
+            tool_name = rpc.params.get("name")
             
             if tool_name == "get_operation_research_problem_answer":
-                user_question = arguments.get("user_question", "")
-                model_name = arguments.get("model_name", DEFAULT_MODEL)
-                max_attempts = arguments.get("max_attempts", 3)
+                arguments = SolveArguments.parse(rpc.params.get("arguments", {}))
+                if arguments is None:
+                    return error_response(-32602, "Invalid params", rpc.id, stream)
                 
-                result = get_operation_research_problem_answer(user_question, model_name, max_attempts)
-                return web.json_response({"jsonrpc": "2.0", "result": result, "id": data.get("id")})
+                # Trivial or malformed questions are answered before touching any cache or the agent
+                result = direct_answer(arguments.user_question)
+                if result is not None:
+                    logger.info("Question answered directly without the agent")
+                    if stream:
+                        return sse_response(
+                            sse_event("output", result) + sse_event("done", {"id": rpc.id, "cached": True})
+                        )
+                    return json_response({"jsonrpc": "2.0", "result": result, "id": rpc.id})
+
+                if stream:
+                    return await stream_answer(
+                        request, rpc.id, arguments.user_question, arguments.model_name, arguments.max_attempts
+                    )
+
+                result = await answer_question(arguments.user_question, arguments.model_name, arguments.max_attempts)
+                return json_response({"jsonrpc": "2.0", "result": result, "id": rpc.id})
             
             if tool_name == "health_check":
-                result = health_check()
-                return web.json_response({"jsonrpc": "2.0", "result": result, "id": data.get("id")})
+                return static_response(HEALTH_CHECK_RESPONSE, rpc.id)
             
-            return web.json_response({"jsonrpc": "2.0", "error": {"code": -32601, "message": f"Method {tool_name} not found"}, "id": data.get("id")})
+            return error_response(-32601, f"Method {tool_name} not found", rpc.id, stream)
         
-        return web.json_response({"jsonrpc": "2.0", "error": {"code": -32601, "message": f"Method {data.get('method')} not found"}, "id": data.get("id")})
+        return error_response(-32601, f"Method {rpc.method} not found", rpc.id, stream)
     
     except Exception as e:
-        logger.error(f"Error handling request: {str(e)}")
-        return web.json_response({"jsonrpc": "2.0", "error": {"code": -32603, "message": f"Internal error: {str(e)}"}, "id": data.get("id", 0)})
+        logger.error("Error handling request: %s", e)
+        return error_response(-32603, f"Internal error: {str(e)}", rpc.id, stream)
 
 # Basic GET handlers
+def etag_for(body):
+    """Strong ETag derived from the response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+def conditional_response(request, body, etag, cache_control, content_type="text/plain"):
+    """
+    Serve a constant body with validators, answering 304 Not Modified when the
+    client (or a caching proxy in front of the server) already holds it.
+    """
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    if_none_match = request.headers.get("If-None-Match", "")
+    if if_none_match == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=body, content_type=content_type, charset="utf-8", headers=headers)
+
+# GET responses never change while the server runs, so bodies and ETags are computed once
+ROOT_BODY = f"{SERVER_NAME} MCP Server is running. Use JSON-RPC for API calls.".encode()
+HEALTH_BODY = health_check().encode()
+TOOLS_BODY = orjson.dumps(TOOLS)
+ROOT_ETAG = etag_for(ROOT_BODY)
+HEALTH_ETAG = etag_for(HEALTH_BODY)
+TOOLS_ETAG = etag_for(TOOLS_BODY)
+
 async def handle_get(request):
-    return web.Response(text=f"{SERVER_NAME} MCP Server is running. Use JSON-RPC for API calls.")
+    return conditional_response(request, ROOT_BODY, ROOT_ETAG, "public, max-age=60")
 
 async def handle_health(request):
-    result = health_check()
-    return web.Response(text=result)
+    # Always revalidated: a proxy must not report a dead server as healthy
+    return conditional_response(request, HEALTH_BODY, HEALTH_ETAG, "no-cache")
+
+async def handle_tools_list(request):
+    return conditional_response(request, TOOLS_BODY, TOOLS_ETAG, "public, max-age=300", "application/json")
+
+async def handle_metrics(request):
+    metrics = {
+        "rpc_cache_enabled": answer_cache is not None,
+        "rpc_cache_hits": answer_cache.hits if answer_cache is not None else 0,
+        "rpc_cache_misses": answer_cache.misses if answer_cache is not None else 0,
+        "rpc_cache_entries": len(answer_cache) if answer_cache is not None else 0,
+        "llm_retries": llm_retry_stats["retries"],
+        "llm_retry_failures": llm_retry_stats["failures"],
+    }
+    return json_response(metrics)
+
+@web.middleware
+async def compression_middleware(request, handler):
+    """Compress larger responses (gzip/deflate, as accepted by the client); streams are left as is."""
+    response = await handler(request)
+    if (isinstance(response, web.Response) and not response.prepared
+            and response.body is not None and len(response.body) >= COMPRESS_MIN_SIZE):
+        response.enable_compression()
+    return response
+
+async def close_http_client(app):
+    """Release the pooled connections shared by the LLM SDK clients."""
+    http_client.close()
+
+async def shutdown_executor(app):
+    """Wait for running agent jobs and stop the worker threads."""
+    # Runs can take minutes; waiting in a helper thread keeps the loop serving the other cleanup hooks
+    await asyncio.get_running_loop().run_in_executor(None, EXECUTOR.shutdown)
 
 # Main function to run the server
-def run_server():
-    app = web.Application()
+def create_app():
+    app = web.Application(client_max_size=MAX_BODY_SIZE, middlewares=[compression_middleware])
+    app.on_cleanup.append(shutdown_executor)
+    app.on_cleanup.append(close_http_client)
     app.router.add_get('/', handle_get)
     app.router.add_get('/health', handle_health)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_get('/tools/list', handle_tools_list)
     app.router.add_post('/', handle_jsonrpc)
     app.router.add_post('/tools/call', handle_jsonrpc)
+    return app
+
+def run_server():
+    app = create_app()
     
-    logger.info(f"🔧 Starting {SERVER_NAME} server...")
-    logger.info(f"📡 Server will be available at: http://{HOST}:{PORT}")
-    logger.info("🛠️  Available endpoints: /, /health, /tools/call")
+    logger.info("🔧 Starting %s server...", SERVER_NAME)
+    logger.info("📡 Server will be available at: http://%s:%s", HOST, PORT)
+    logger.info("🛠️  Available endpoints: /, /health, /metrics, /tools/list, /tools/call")
     
     web.run_app(app, host=HOST, port=PORT, access_log=logger)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     try:
         run_server()
     except KeyboardInterrupt:
         logger.info("Server stopped by user")
     except Exception as e:
-        logger.error(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
@@ -0,0 +1,374 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unlocked access
+    fcntl = None
+
+
+def normalize_question(question):
+    """
+    Canonicalize a question so trivially different submissions share a cache entry.
+
+    Args:
+        question (str): Raw user question.
+
+    Returns:
+        str: The question lower-cased with runs of whitespace collapsed.
+    """
+    return " ".join(question.split()).lower()
+
+def cache_key(model_name, question):
+    """
+    Build the cache key for a (model, question) pair.
+
+    Args:
+        model_name (str): LLM model name used to answer the question.
+        question (str): Raw user question.
+
+    Returns:
+        str: Hex sha256 digest of the model name and normalized question.
+    """
+    return hashlib.sha256(f"{model_name}||{normalize_question(question)}".encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache whose entries expire after ttl seconds.
+    """
+
+    def __init__(self, maxsize=10_000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entry when full."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    File-system cache with one text file per key, sharded by the first two
+    characters of the key so that no single directory grows too large.
+    Entries older than ttl seconds are treated as missing.
+    """
+
+    def __init__(self, directory, ttl=86400):
+        self.directory = Path(directory)
+        self.ttl = ttl
+
+    def path(self, key):
+        """Return the file that stores key."""
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        """Return the cached text for key, or None if it is missing or expired."""
+        path = self.path(key)
+        try:
+            if self.ttl is not None and path.stat().st_mtime <= time.time() - self.ttl:
+                return None
+            return path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        """Atomically write value under key."""
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                tmp_file.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @contextmanager
+    def lock(self, key):
+        """
+        Hold an exclusive per-key lock, so concurrent identical requests (threads
+        or processes) compute the value only once. A no-op where fcntl is unavailable.
+        """
+        if fcntl is None:
+            yield
+            return
+        lock_path = self.path(key).with_suffix(".lock")
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def clear(self):
+        """Remove every cached entry."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+# Integers and decimals; "1,000" and "1000" count as different data, which only costs a miss
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def numeric_tokens(text):
+    """
+    Extract the numbers of a text, in order.
+
+    Problems that differ only in their data embed almost identically, so a
+    semantic hit must also agree on these.
+
+    Args:
+        text (str): Question or conversation text.
+
+    Returns:
+        str: The numbers separated by single spaces.
+    """
+    return " ".join(_NUMBER_RE.findall(text))
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over text embeddings, so paraphrased (or translated)
+    questions can reuse an earlier answer. Vectors are L2-normalized, so the
+    inner product is the cosine similarity. Entries are namespaced (e.g. by
+    model name) and only match within the same namespace and with the same
+    numeric tokens, see numeric_tokens().
+
+    Entries are appended to the files in directory and the files are rewritten
+    only when the oldest entries are dropped, so an insert costs O(1) amortized.
+    """
+
+    def __init__(self, embed, threshold=0.95, maxsize=10_000, directory=None):
+        """
+        Args:
+            embed: Callable mapping a string to its embedding vector.
+            threshold (float): Minimum cosine similarity for a hit.
+            maxsize (int): Maximum number of entries; the oldest are dropped first.
+            directory (str or Path): Where to persist the cache, or None to keep it in memory only.
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.directory = Path(directory) if directory is not None else None
+        # Rows [0, len(self._entries)) of a buffer that grows by doubling up to 2 * maxsize rows
+        self._vectors = None
+        self._entries = []
+        self._lock = threading.Lock()
+        self._load()
+
+    def encode(self, text):
+        """Return the normalized embedding of text."""
+        vector = np.asarray(self.embed(text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def search(self, vector, namespace="", numbers=""):
+        """
+        Return the value of the most similar entry in namespace with the same
+        numeric tokens, or None if no such entry reaches the similarity threshold.
+        """
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                return None
+            start = max(0, len(self._entries) - self.maxsize)
+            entries = self._entries[start:]
+            scores = self._vectors[start:len(self._entries)] @ vector
+            mask = np.fromiter(
+                (ns == namespace and nums == numbers for ns, nums, _ in entries), dtype=bool, count=len(entries)
+            )
+            scores[~mask] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            return entries[best][2]
+
+    def add(self, vector, value, namespace="", numbers=""):
+        """Store value under the (normalized) embedding vector and the numeric tokens of its text."""
+        with self._lock:
+            row = vector.astype(np.float32)
+            if self._vectors is None or self._vectors.shape[1] != row.shape[0]:
+                self._vectors, self._entries = np.empty((1, row.shape[0]), dtype=np.float32), []
+                self._rewrite()
+            size = len(self._entries)
+            if size == len(self._vectors):
+                if size >= 2 * self.maxsize:
+                    # Drop the oldest entries in one go, once every maxsize inserts
+                    self._vectors[:self.maxsize] = self._vectors[size - self.maxsize:size]
+                    del self._entries[:size - self.maxsize]
+                    self._rewrite()
+                else:
+                    grown = np.empty((min(2 * size, 2 * self.maxsize), row.shape[0]), dtype=np.float32)
+                    grown[:size] = self._vectors
+                    self._vectors = grown
+                size = len(self._entries)
+            self._vectors[size] = row
+            entry = (namespace, numbers, value)
+            self._entries.append(entry)
+            self._append(row, entry)
+
+    def _load(self):
+        if self.directory is None:
+            return
+        try:
+            with open(self.directory / "entries.jsonl", encoding="utf-8") as f:
+                dim = json.loads(f.readline())["dim"]
+                entries = []
+                torn = False
+                for line in f:
+                    try:
+                        entries.append(tuple(json.loads(line)))
+                    except ValueError:
+                        # Torn final line of an interrupted append
+                        torn = True
+                        break
+            vectors = np.fromfile(self.directory / "vectors.f32", dtype=np.float32)
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return
+        # Vectors are written before their entry, so a crash leaves at most extra vectors
+        count = min(len(entries), vectors.size // dim)
+        if count:
+            self._vectors = vectors[:count * dim].reshape(count, dim).copy()
+            self._entries = entries[:count]
+            if torn or len(entries) != count or vectors.size != count * dim:
+                # Drop the leftovers before anything is appended, or every later row would pair with the wrong entry
+                self._rewrite()
+
+    def _append(self, row, entry):
+        if self.directory is None:
+            return
+        with open(self.directory / "vectors.f32", "ab") as f:
+            f.write(row.tobytes())
+        with open(self.directory / "entries.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _rewrite(self):
+        """Replace the files with the current entries (after a dimension change or dropping old entries)."""
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_vectors = self.directory / "vectors.f32.tmp"
+        tmp_entries = self.directory / "entries.jsonl.tmp"
+        self._vectors[:len(self._entries)].tofile(tmp_vectors)
+        with open(tmp_entries, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"dim": self._vectors.shape[1]}) + "\n")
+            f.writelines(json.dumps(entry) + "\n" for entry in self._entries)
+        os.replace(tmp_vectors, self.directory / "vectors.f32")
+        os.replace(tmp_entries, self.directory / "entries.jsonl")
+
+
+def prompt_key(messages, model_name, temperature):
+    """
+    Build the cache key for an LLM request.
+
+    Args:
+        messages (list): Chat messages sent to the model.
+        model_name (str): LLM model name.
+        temperature (float): Sampling temperature.
+
+    Returns:
+        str: Hex blake2b digest of the canonical JSON of the request.
+    """
+    payload = json.dumps(
+        {"model": model_name, "temperature": temperature, "messages": messages},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=32).hexdigest()
+
+
+class PromptCache:
+    """
+    Cache of LLM completions keyed on (model, temperature, messages). Lookups go
+    through an in-memory tier, then an optional disk tier, then an optional
+    semantic tier that matches near-identical conversations by embedding.
+    """
+
+    def __init__(self, memory, disk=None, semantic=None):
+        """
+        Args:
+            memory (TTLCache): In-process exact-match tier.
+            disk (DiskCache): Persistent exact-match tier, or None.
+            semantic (SemanticCache): Embedding-similarity tier, or None.
+        """
+        self.memory = memory
+        self.disk = disk
+        self.semantic = semantic
+
+    @staticmethod
+    def _semantic_text(messages):
+        return "\n\n".join(f"{m['role']}: {m['content']}" for m in messages)
+
+    def lookup(self, messages, model_name, temperature):
+        """
+        Look up the completion of a request.
+
+        Returns:
+            tuple: (ticket, completion) where completion is None on a miss. Pass
+            the ticket to store() so the key and embedding are computed only once.
+        """
+        key = prompt_key(messages, model_name, temperature)
+        namespace = f"{model_name}|{temperature}"
+        numbers = ""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        vector = None
+        if value is None and self.semantic is not None:
+            text = self._semantic_text(messages)
+            numbers = numeric_tokens(text)
+            try:
+                vector = self.semantic.encode(text)
+            except Exception:
+                # Embedding failures only disable the semantic tier for this request
+                vector = None
+            else:
+                value = self.semantic.search(vector, namespace=namespace, numbers=numbers)
+        return (key, namespace, vector, numbers), value
+
+    def store(self, ticket, completion):
+        """Store a completion under the ticket returned by lookup()."""
+        key, namespace, vector, numbers = ticket
+        self.memory.set(key, completion)
+        if self.disk is not None:
+            self.disk.set(key, completion)
+        if vector is not None:
+            self.semantic.add(vector, completion, namespace=namespace, numbers=numbers)
@@ -1,54 +1,186 @@
 import openai
-import anthropic
+import httpx
+import orjson
 import requests
-import google.generativeai as genai
+from requests.adapters import HTTPAdapter
+import numpy as np
 from dotenv import load_dotenv
 import os
+import io
+import json
+import hashlib
+import math
+import random
 import re
+import time
+import signal
 import subprocess
 import sys
+import asyncio
 import tempfile
-import copy
-from itertools import zip_longest
+import threading
+import functools
+import importlib
+import weakref
+import linecache
+import traceback
+from contextlib import asynccontextmanager, contextmanager, suppress
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import ContextVar
+from typing import Final
+from src.modules.cache import TTLCache, DiskCache, SemanticCache, PromptCache
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Anthropic API setup
+# Shared HTTP connection pool for the LLM SDK clients, so repeated calls reuse keep-alive connections
+http_client = httpx.Client(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    timeout=float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+)
+
+# Anthropic API setup (the SDK is imported and the clients built on first use, see get_anthropic_client())
 anthropic_api_data = dict(
     api_key = os.getenv("CLAUDE_API_KEY"),
 )
-anthropic_client = anthropic.Anthropic(
-    api_key=anthropic_api_data["api_key"]
-)
 
 # Ollama API setup
 ollama_api_data = dict(
-    base_url = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
+    base_url = os.getenv("OLLAMA_API_BASE", "http://localhost:11434"),
+    timeout = (5, 120)  # (connect, read) seconds
 )
+_ollama_session = requests.Session()
+_ollama_session.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+_ollama_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
 
 # OpenAI API setup
 openai_api_data = dict(
     api_key = os.getenv("OPENAI_API_KEY"),
-    base_url = os.getenv("OPENAI_API_BASE")
+    base_url = os.getenv("OPENAI_API_BASE"),
+    # Extra OpenAI-compatible endpoints (comma-separated), shared round-robin by parallel candidates
+    extra_base_urls = [url.strip() for url in os.getenv("OPENAI_API_BASES", "").split(",") if url.strip()]
 )  
 openai_client = openai.OpenAI(
     api_key=openai_api_data["api_key"],
-    base_url=openai_api_data["base_url"] if openai_api_data["base_url"] else None
+    base_url=openai_api_data["base_url"] if openai_api_data["base_url"] else None,
+    http_client=http_client,
+    max_retries=0  # Retried by call_with_retries()
 )
+openai_clients = [openai_client] + [
+    openai.OpenAI(api_key=openai_api_data["api_key"], base_url=base_url, http_client=http_client, max_retries=0)
+    for base_url in openai_api_data["extra_base_urls"]
+]
 
-# Gemini API setup
+# Gemini API setup (the SDK is imported and configured on first use, see _get_genai())
 gemini_api_data = dict(
     api_key = os.getenv("GEMINI_API_KEY"),
 )
-genai.configure(
-    api_key=gemini_api_data["api_key"]
+
+# Cache of LLM completions keyed on model, temperature and messages (delete OR_CACHE_DIR to invalidate)
+prompt_cache_config = dict(
+    enabled = os.getenv("PROMPT_CACHE_ENABLED", "1") == "1",
+    directory = os.getenv("OR_CACHE_DIR", ".or_cache"),
+    ttl = int(os.getenv("PROMPT_CACHE_TTL", "86400")),
+    max_entries = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "1024")),
+    semantic = os.getenv("PROMPT_SEMANTIC_CACHE_ENABLED", "0") == "1",
+    semantic_model = os.getenv("PROMPT_SEMANTIC_CACHE_MODEL", "text-embedding-3-small"),
+    semantic_threshold = float(os.getenv("PROMPT_SEMANTIC_CACHE_THRESHOLD", "0.98")),
+)
+
+# Cache of final agent results per (agent, model, question), so repeated benchmark runs skip solved problems
+result_cache_config = dict(
+    enabled = os.getenv("RESULT_CACHE_ENABLED", "1") == "1",
+    directory = os.getenv("OR_CACHE_DIR", ".or_cache"),
+    ttl = int(os.getenv("RESULT_CACHE_TTL", "86400")),
+)
+result_cache = DiskCache(
+    os.path.join(result_cache_config["directory"], "results"),
+    ttl=result_cache_config["ttl"]
+) if result_cache_config["enabled"] else None
+
+# Retries of transient LLM API failures (rate limits, overload, dropped connections, timeouts)
+llm_retry_config = dict(
+    attempts = int(os.getenv("LLM_RETRY_ATTEMPTS", "5")),
+    base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "1")),
+    max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", "60")),
+    timeout = float(os.getenv("LLM_REQUEST_TIMEOUT", "120")),
+)
+llm_retry_stats = dict(retries=0, failures=0)
+_retry_stats_lock = threading.Lock()
+
+# Limits for running generated code blocks
+code_exec_config = dict(
+    timeout = float(os.getenv("OR_CODE_TIMEOUT", "600")),
+    stderr_lines = int(os.getenv("OR_CODE_STDERR_LINES", "200")),
+    # Run code in a forked copy of this process instead of a new interpreter (POSIX only)
+    fork = os.getenv("OR_CODE_FORK", "1") == "1" and hasattr(os, "fork"),
+    # Sample one code candidate per temperature in parallel (e.g. "0.1,0.4,0.7"); empty means a single sample
+    candidate_temperatures = [float(t) for t in os.getenv("OR_CANDIDATE_TEMPERATURES", "").split(",") if t.strip()],
+    # Start one Gurobi environment in the agent process and let every forked script's models use it
+    share_gurobi_env = os.getenv("OR_SHARE_GUROBI_ENV", "0") == "1",
 )
 
+# Patterns used on every solver log and every LLM reply, compiled once
+_BEST_OBJ_RE = re.compile(r'Best objective\s+([\d.e+-]+)')
+_OPT_OBJ_RE = re.compile(r'Optimal objective\s+([\d.e+-]+)')
+_PY_BLOCK_RE = re.compile(r'```python\s*([\s\S]*?)```')
+
+# Destination for print() output of the current thread/task, see capture_stdout()
+_stdout_sink = ContextVar("stdout_sink", default=None)
+_stdout_install_lock = threading.Lock()
+
+
+class _ContextStdout:
+    """
+    sys.stdout proxy that sends writes to the sink of the current context,
+    falling back to the original stream when no capture is active.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, s):
+        sink = _stdout_sink.get()
+        if sink is None:
+            return self._stream.write(s)
+        sink.write(s)
+        return len(s)
+
+    def flush(self):
+        if _stdout_sink.get() is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextmanager
+def capture_stdout(sink):
+    """
+    Capture print() output of the current thread or asyncio task into sink.
+
+    Unlike contextlib.redirect_stdout this does not swap sys.stdout for the
+    whole process, so several agent runs can be captured concurrently from
+    worker threads.
+
+    Args:
+        sink: Any object with a write(str) method, e.g. io.StringIO.
+    """
+    with _stdout_install_lock:
+        if not isinstance(sys.stdout, _ContextStdout):
+            sys.stdout = _ContextStdout(sys.stdout)
+    token = _stdout_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _stdout_sink.reset(token)
+
 
 def is_number_string(s):
     """
-    Determine if a string is a numeric string, including integers and decimals.
+    Determine if a string is a numeric string, including integers, decimals and
+    scientific notation. Non-finite values ('inf', 'nan') are not numbers here.
 
     Args:
     s: The string to be checked.
@@ -56,8 +188,10 @@ def is_number_string(s):
     Returns:
     True if the string is a numeric string, otherwise False.
     """
-    pattern = r"^[-+]?\d+(\.\d+)?$"  # Regular expression to match integers or decimals
-    return re.match(pattern, s) is not None
+    try:
+        return math.isfinite(float(s))
+    except (ValueError, TypeError):
+        return False
 
 def convert_to_number(s):
     """
@@ -71,12 +205,11 @@ def convert_to_number(s):
         Returns None if conversion fails.
     """
     try:
-        # Try to convert to integer
-        if s.isdigit() or (s.startswith('-') and s[1:].isdigit()):
-            return int(s)
-        # Try to convert to float
-        num = float(s)
-        return num
+        return int(s)
+    except (ValueError, TypeError):
+        pass
+    try:
+        return float(s)
     except (ValueError, TypeError):
         return None
 
@@ -95,10 +228,10 @@ def extract_best_objective(output_text):
         return None
     
     # Try to find Best objective
-    match = re.search(r'Best objective\s+([\d.e+-]+)', output_text)
+    match = _BEST_OBJ_RE.search(output_text)
     if not match:
         # If not found, try to find Optimal objective
-        match = re.search(r'Optimal objective\s+([\d.e+-]+)', output_text)
+        match = _OPT_OBJ_RE.search(output_text)
     
     if match:
         try:
@@ -108,6 +241,208 @@ def extract_best_objective(output_text):
     
     return None
 
+class _ObjectiveScanner:
+    """
+    Incremental version of extract_best_objective, fed one output line at a time.
+    """
+
+    def __init__(self):
+        self.infeasible = False
+        self.best = None
+        self.optimal = None
+
+    def feed(self, line):
+        if "Model is infeasible" in line:
+            self.infeasible = True
+        if self.best is None:
+            self.best = _BEST_OBJ_RE.search(line)
+        if self.optimal is None:
+            self.optimal = _OPT_OBJ_RE.search(line)
+
+    @property
+    def value(self):
+        match = self.best or self.optimal
+        if self.infeasible or not match:
+            return None
+        try:
+            return float(match.group(1))
+        except ValueError:
+            return None
+
+def _stream_process(proc, timeout):
+    """
+    Echo the stdout of a running code block line by line while scanning it for the
+    objective value, keeping only the tail of stderr.
+
+    Args:
+        proc: Running process with text-mode stdout and stderr pipes (subprocess.Popen).
+        timeout (float): Seconds after which the process is killed.
+
+    Returns:
+        tuple: (returncode, best objective or None, stderr tail, timed_out)
+    """
+    stderr_tail = deque(maxlen=code_exec_config["stderr_lines"])
+    stderr_reader = threading.Thread(target=stderr_tail.extend, args=(proc.stderr,), daemon=True)
+    stderr_reader.start()
+
+    timed_out = threading.Event()
+    def kill():
+        timed_out.set()
+        proc.kill()
+    watchdog = threading.Timer(timeout, kill)
+    watchdog.start()
+
+    scanner = _ObjectiveScanner()
+    try:
+        for line in proc.stdout:
+            print(line, end="")
+            scanner.feed(line)
+        returncode = proc.wait()
+    finally:
+        watchdog.cancel()
+    stderr_reader.join()
+    return returncode, scanner.value, "".join(stderr_tail), timed_out.is_set()
+
+@functools.lru_cache(maxsize=None)
+def _preload_solver():
+    """
+    Import gurobipy once in the parent, so forked children inherit the loaded
+    bindings. With share_gurobi_env, also start the environment they will share.
+
+    Returns:
+        The shared gurobipy.Env, or None.
+    """
+    try:
+        import gurobipy as gp
+    except ImportError:
+        return None
+    if not code_exec_config["share_gurobi_env"]:
+        return None
+    env = gp.Env(empty=True)
+    env.start()
+    return env
+
+def _use_shared_gurobi_env(env):
+    """
+    In a forked child, make models created by the generated code default to env,
+    so they skip the license check and log setup of a new environment.
+    """
+    import gurobipy as gp
+
+    class Model(gp.Model):
+        def __init__(self, name="", env=env, **kwargs):
+            super().__init__(name, env=env, **kwargs)
+
+    gp.Model = Model
+
+def _exec_in_child(code, gurobi_env=None):
+    """
+    Body of the forked child: run code as __main__ with stdout/stderr on fds 1/2,
+    then exit without returning into the parent's stack.
+    """
+    exit_code = 1
+    try:
+        # Drop every descriptor inherited from the parent (sockets, other children's pipes)
+        os.closerange(3, os.sysconf("SC_OPEN_MAX"))
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        sys.stdout = open(1, "w", buffering=1, encoding="utf-8", closefd=False)
+        sys.stderr = open(2, "w", buffering=1, encoding="utf-8", closefd=False)
+        if gurobi_env is not None:
+            _use_shared_gurobi_env(gurobi_env)
+        # Let tracebacks show the offending source lines of the generated code
+        linecache.cache["<generated>"] = (len(code), None, code.splitlines(True), "<generated>")
+        try:
+            exec(compile(code, "<generated>", "exec"), {"__name__": "__main__"})
+            exit_code = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+        except BaseException as e:
+            # Skip this frame, so the traceback starts in the generated code
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+    finally:
+        with suppress(Exception):
+            sys.stdout.flush()
+            sys.stderr.flush()
+        os._exit(exit_code)
+
+class _ForkedProcess:
+    """
+    Popen-like handle on a forked child that executes a code block. The child
+    shares the already-initialized interpreter and solver bindings copy-on-write,
+    so no new Python process has to start and import gurobipy again.
+    """
+
+    def __init__(self, code):
+        gurobi_env = _preload_solver()
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        self.pid = os.fork()
+        if self.pid == 0:
+            os.dup2(out_w, 1)
+            os.dup2(err_w, 2)
+            _exec_in_child(code, gurobi_env)
+        os.close(out_w)
+        os.close(err_w)
+        self.returncode = None
+        self.stdout = open(out_r, encoding="utf-8", errors="replace")
+        self.stderr = open(err_r, encoding="utf-8", errors="replace")
+
+    def wait(self):
+        if self.returncode is None:
+            _, status = os.waitpid(self.pid, 0)
+            self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def kill(self):
+        if self.returncode is None:
+            with suppress(ProcessLookupError):
+                os.kill(self.pid, signal.SIGKILL)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stdout.close()
+        self.stderr.close()
+        self.wait()
+
+class _ProcessGroup:
+    """
+    Running code blocks of the candidates of one _solve_with_candidates call,
+    so the losers can be killed once a winner is chosen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procs = set()
+        self._closed = False
+
+    def add(self, proc):
+        with self._lock:
+            self._procs.add(proc)
+            closed = self._closed
+        if closed:
+            # Started after the winner was chosen
+            proc.kill()
+
+    def discard(self, proc):
+        with self._lock:
+            self._procs.discard(proc)
+
+    def kill_all(self):
+        with self._lock:
+            self._closed = True
+            procs = list(self._procs)
+        for proc in procs:
+            proc.kill()
+
+# Process group the code blocks of the current thread are registered in, see _solve_with_candidates()
+_process_group = ContextVar("process_group", default=None)
+
 def extract_and_execute_python_code(text_content):
     """
     Extract Python code blocks from text and execute them.
@@ -119,50 +454,110 @@ def extract_and_execute_python_code(text_content):
         bool: True if execution was successful, False otherwise
         str: Error message if execution failed, best objective if successful
     """
-    python_code_blocks = re.findall(r'```python\s*([\s\S]*?)```', text_content)
+    # Only the first non-empty block is executed, so stop scanning as soon as it is found
+    code_block = None
+    for match in _PY_BLOCK_RE.finditer(text_content):
+        code_block = match.group(1).strip()
+        if code_block:
+            break
+        print("Found an empty Python code block, skipped.")
 
-    if not python_code_blocks:
+    if code_block is None:
         print("No Python code blocks found.")
         return False, "No Python code blocks found"
+    if not code_block:
+        return False, "No valid code blocks executed"
 
-    for code_block in python_code_blocks:
-        code_block = code_block.strip()
-        if not code_block:
-            print("Found an empty Python code block, skipped.")
-            continue
-
-        print("Found Python code block, starting execution...")
-        try:
+    print("Found Python code block, starting execution...")
+    temp_file_path = None
+    try:
+        if code_exec_config["fork"]:
+            proc = _ForkedProcess(code_block)
+        else:
             with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as tmp_file:
                 tmp_file.write(code_block)
-                temp_file_path = tmp_file.name
-
-            result = subprocess.run([sys.executable, temp_file_path], capture_output=True, text=True, check=False)
-
-            if result.returncode == 0:
-                print("Python code executed successfully, output:\n")
-                print(result.stdout)
-                
-                best_obj = extract_best_objective(result.stdout)
-                if best_obj is not None:
-                    print(f"\nOptimal solution value (Best objective): {best_obj}")
-                else:
-                    print("\nOptimal solution value not found")
-                return True, str(best_obj)
-            else:
-                print(f"Python code execution error, error message:\n")
-                print(result.stderr)
-                return False, result.stderr
+            temp_file_path = tmp_file.name
+            proc = subprocess.Popen(
+                [sys.executable, "-u", temp_file_path],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1
+            )
 
-        except Exception as e:
-            print(f"Error occurred while executing Python code block: {e}")
-            return False, str(e)
+        print("Python code output:\n")
+        group = _process_group.get()
+        if group is not None:
+            group.add(proc)
+        try:
+            with proc:
+                returncode, best_obj, stderr, timed_out = _stream_process(proc, code_exec_config["timeout"])
         finally:
-            if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-        print("-" * 30)
+            if group is not None:
+                group.discard(proc)
 
-    return False, "No valid code blocks executed"
+        if timed_out:
+            error_msg = f"Code execution timed out after {code_exec_config['timeout']:g} seconds"
+            print(error_msg)
+            return False, error_msg
+        elif returncode == 0:
+            print("\nPython code executed successfully")
+            if best_obj is not None:
+                print(f"\nOptimal solution value (Best objective): {best_obj}")
+            else:
+                print("\nOptimal solution value not found")
+            return True, str(best_obj)
+        else:
+            print(f"Python code execution error, error message:\n")
+            print(stderr)
+            return False, stderr
+
+    except Exception as e:
+        print(f"Error occurred while executing Python code block: {e}")
+        return False, str(e)
+    finally:
+        if temp_file_path is not None:
+            with suppress(FileNotFoundError):
+                os.unlink(temp_file_path)
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return float("nan")
+
+def eval_model_result_batch(successes, results, ground_truths, err_range=0.1):
+    """
+    Evaluate many agent results against their ground truths at once; the
+    vectorized counterpart of eval_model_result() for large result sets.
+
+    Args:
+        successes: Whether each run executed its code successfully.
+        results: Best objective of each run (number, numeric string or 'None').
+        ground_truths: Expected objective of each problem, None if it has no solution.
+        err_range (float): Absolute tolerance for a numeric result to count as correct.
+
+    Returns:
+        tuple: (pass_mask, correct_mask) boolean numpy arrays.
+    """
+    results = list(results)
+    ground_truths = list(ground_truths)
+    n = len(results)
+    pass_mask = np.fromiter((bool(s) for s in successes), dtype=bool, count=n)
+    result_strs = [str(r) for r in results]
+    parseable = np.fromiter((is_number_string(r) for r in result_strs), dtype=bool, count=n)
+    has_truth = np.fromiter((g is not None for g in ground_truths), dtype=bool, count=n)
+
+    numeric = pass_mask & parseable & has_truth
+    result_nums = np.fromiter((_as_float(r) if m else np.nan for r, m in zip(result_strs, numeric)), dtype=float, count=n)
+    truth_nums = np.fromiter((_as_float(g) if m else np.nan for g, m in zip(ground_truths, numeric)), dtype=float, count=n)
+    with np.errstate(invalid="ignore"):
+        numeric_correct = numeric & (np.abs(result_nums - truth_nums) < err_range)
+
+    # A 'None' result is correct when the problem has no available solution either
+    no_solution = np.fromiter(
+        (r == 'None' and (g is None or g == 'None') for r, g in zip(results, ground_truths)),
+        dtype=bool, count=n
+    )
+    correct_mask = numeric_correct | (pass_mask & ~numeric & no_solution)
+    return pass_mask, correct_mask
 
 def eval_model_result(success, result, ground_truth, err_range=0.1):
     pass_flag = False
@@ -180,7 +575,337 @@ def eval_model_result(success, result, ground_truth, err_range=0.1):
     return pass_flag, correct_flag 
 
 
-def query_llm(messages, model_name="gpt-4", temperature=0.2):
+def embed_text(text, model_name="text-embedding-3-small"):
+    """
+    Compute an embedding vector for a piece of text with the OpenAI embeddings API.
+
+    Args:
+        text (str): Text to embed.
+        model_name (str): Embedding model name, default is "text-embedding-3-small".
+
+    Returns:
+        list: The embedding as a list of floats.
+    """
+    response = call_with_retries(openai_client.embeddings.create, model=model_name, input=text)
+    return response.data[0].embedding
+
+prompt_cache = PromptCache(
+    TTLCache(maxsize=prompt_cache_config["max_entries"], ttl=prompt_cache_config["ttl"]),
+    disk=DiskCache(os.path.join(prompt_cache_config["directory"], "prompts"), ttl=prompt_cache_config["ttl"]),
+    semantic=SemanticCache(
+        lambda text: embed_text(text, prompt_cache_config["semantic_model"]),
+        threshold=prompt_cache_config["semantic_threshold"],
+        directory=os.path.join(prompt_cache_config["directory"], "prompt_semantic")
+    ) if prompt_cache_config["semantic"] else None
+) if prompt_cache_config["enabled"] else None
+
+
+class RetryableStatusError(Exception):
+    """Raised for HTTP responses that are worth retrying (429 and 5xx)."""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+# Extended with the errors of the Anthropic and Gemini SDKs when they are first imported
+_retryable_errors = [
+    openai.RateLimitError,
+    openai.APIConnectionError,  # Includes APITimeoutError
+    openai.InternalServerError,
+    requests.ConnectionError,
+    requests.Timeout,
+    RetryableStatusError,
+    TimeoutError,
+]
+
+@functools.lru_cache(maxsize=None)
+def _get_anthropic():
+    """Import the Anthropic SDK on first use, so OpenAI-only runs never load it."""
+    anthropic = importlib.import_module("anthropic")
+    _retryable_errors.extend([anthropic.RateLimitError, anthropic.APIConnectionError, anthropic.InternalServerError])
+    return anthropic
+
+@functools.lru_cache(maxsize=None)
+def _get_genai():
+    """Import and configure the Gemini SDK on first use."""
+    genai = importlib.import_module("google.generativeai")
+    google_exceptions = importlib.import_module("google.api_core.exceptions")
+    genai.configure(
+        api_key=gemini_api_data["api_key"]
+    )
+    _retryable_errors.extend([
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+    ])
+    return genai
+
+@functools.lru_cache(maxsize=None)
+def get_anthropic_client():
+    """Return the shared Anthropic client, built on first use."""
+    return _get_anthropic().Anthropic(
+        api_key=anthropic_api_data["api_key"],
+        http_client=http_client,
+        max_retries=0
+    )
+
+# Async clients of each event loop; pooled connections belong to the loop that opened them
+_async_clients = weakref.WeakKeyDictionary()
+
+def _get_async_clients():
+    """Return the async clients of the running event loop, built on first use in that loop."""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+        )
+        clients = dict(
+            http=http,
+            openai=openai.AsyncOpenAI(
+                api_key=openai_api_data["api_key"],
+                base_url=openai_api_data["base_url"] if openai_api_data["base_url"] else None,
+                http_client=http,
+                max_retries=0  # Retried by acall_with_retries()
+            ),
+            anthropic=None,
+            users=0
+        )
+        _async_clients[loop] = clients
+    return clients
+
+def get_async_openai_client():
+    """Return the AsyncOpenAI client of the running event loop."""
+    return _get_async_clients()["openai"]
+
+def get_async_anthropic_client():
+    """Return the AsyncAnthropic client of the running event loop, built on first use."""
+    clients = _get_async_clients()
+    if clients["anthropic"] is None:
+        clients["anthropic"] = _get_anthropic().AsyncAnthropic(
+            api_key=anthropic_api_data["api_key"],
+            http_client=clients["http"],
+            max_retries=0
+        )
+    return clients["anthropic"]
+
+@asynccontextmanager
+async def async_llm_clients():
+    """
+    Keep the async clients of the running event loop open for the body and
+    close their connections when the last such block on that loop exits.
+    Code calling aquery_llm directly should wrap its work in this, so no
+    connections are left to a loop that is about to be closed.
+    """
+    clients = _get_async_clients()
+    clients["users"] += 1
+    try:
+        yield
+    finally:
+        clients["users"] -= 1
+        if clients["users"] == 0:
+            _async_clients.pop(asyncio.get_running_loop(), None)
+            await clients["http"].aclose()
+
+def _is_retryable(error):
+    # SDK status errors outside the known classes (e.g. Anthropic's 529 "overloaded") are matched by status code
+    status = getattr(error, "status_code", None)
+    return isinstance(error, tuple(_retryable_errors)) or (isinstance(status, int) and (status == 429 or status >= 500))
+
+def _retry_delay(attempt, error):
+    """Seconds to wait before retry number attempt (0-based), honouring Retry-After when sent."""
+    response = getattr(error, "response", None)
+    retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), llm_retry_config["max_delay"])
+    except ValueError:
+        pass
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(llm_retry_config["max_delay"], llm_retry_config["base_delay"] * 2 ** attempt))
+
+def _note_retry(attempt, error):
+    attempts = llm_retry_config["attempts"]
+    with _retry_stats_lock:
+        if attempt + 1 >= attempts:
+            llm_retry_stats["failures"] += 1
+            return None
+        llm_retry_stats["retries"] += 1
+    delay = _retry_delay(attempt, error)
+    print(f"LLM request failed ({type(error).__name__}: {error}), retrying in {delay:.1f}s ({attempt + 1}/{attempts - 1})")
+    return delay
+
+def call_with_retries(func, *args, **kwargs):
+    """
+    Call func, retrying transient API errors with exponential backoff.
+
+    Returns:
+        The return value of func. The last error is raised once llm_retry_config["attempts"] calls failed.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not _is_retryable(e):
+                raise
+            delay = _note_retry(attempt, e)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+
+async def acall_with_retries(func, *args, **kwargs):
+    """Async version of call_with_retries, for coroutine functions."""
+    attempt = 0
+    while True:
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            if not _is_retryable(e):
+                raise
+            delay = _note_retry(attempt, e)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+
+_OLLAMA_HEADERS = {"Content-Type": "application/json"}
+
+def _ollama_post(url, body):
+    response = _ollama_session.post(url, data=body, headers=_OLLAMA_HEADERS, timeout=ollama_api_data["timeout"])
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableStatusError(response)
+    return response
+
+def _ollama_request(messages, model_name, temperature):
+    """Build the Ollama chat URL and JSON-encoded body for an "ollama:<model>" model name."""
+    # Extract the actual model name after the "ollama:" prefix
+    ollama_model = model_name.split(":", 1)[1]
+    payload = {
+        "model": ollama_model,
+        "messages": messages,
+        "temperature": temperature,
+        "stream": False
+    }
+    # Encoded once with orjson, and reused as is by every retry
+    return f"{ollama_api_data['base_url']}/api/chat", orjson.dumps(payload)
+
+def _split_system(messages):
+    """
+    Partition OpenAI-style messages in a single pass.
+
+    Returns:
+        tuple: (system_message, chat) where system_message is the content of the
+        first system message ("" if none) and chat lists the user/assistant turns
+        in order, with consecutive turns of the same role merged.
+    """
+    system_message = ""
+    chat = []
+    for m in messages:
+        role = m["role"]
+        if role == "system":
+            system_message = system_message or m["content"]
+        elif chat and chat[-1][0] == role:
+            # Both APIs expect alternating turns; merge consecutive ones with a single join
+            chat[-1][1].append(m["content"])
+        elif role in ("user", "assistant"):
+            chat.append((role, [m["content"]]))
+    return system_message, [(role, "\n\n".join(parts)) for role, parts in chat]
+
+def _claude_request(messages):
+    """
+    Convert OpenAI-style messages into Anthropic's system and messages parameters.
+
+    The turns are passed natively instead of being flattened into one prompt, so
+    the provider prefix cache can reuse every earlier turn of the conversation.
+    Cache breakpoints are set on the system prompt and on the latest turn.
+    """
+    system_message, chat = _split_system(messages)
+    claude_messages = [{"role": role, "content": content} for role, content in chat]
+    if claude_messages:
+        last = claude_messages[-1]
+        last["content"] = [{"type": "text", "text": last["content"], "cache_control": {"type": "ephemeral"}}]
+
+    system = [{
+        "type": "text",
+        "text": system_message,
+        "cache_control": {"type": "ephemeral"}
+    }] if system_message else _get_anthropic().NOT_GIVEN
+    return system, claude_messages
+
+def _gemini_messages(messages):
+    """Convert OpenAI-style messages into Gemini contents, folding the system prompt into the first user turn."""
+    system_message, chat = _split_system(messages)
+    gemini_messages = [
+        {"role": "model" if role == "assistant" else "user", "parts": [content]}
+        for role, content in chat
+    ]
+
+    # Gemini doesn't have explicit system role, prepend it to the first user message
+    if system_message:
+        for msg in gemini_messages:
+            if msg["role"] == "user":
+                msg["parts"][0] = f"{system_message}\n\n{msg['parts'][0]}"
+                break
+        else:
+            # If no user message found, create one with just the system message
+            gemini_messages.insert(0, {
+                "role": "user",
+                "parts": [system_message]
+            })
+    return gemini_messages
+
+@functools.lru_cache(maxsize=8)
+def _get_gemini_client(model_name):
+    """Return the GenerativeModel for model_name, built once and reused across calls."""
+    return _get_genai().GenerativeModel(model_name)
+
+def _gemini_generation_config(temperature):
+    return _get_genai().types.GenerationConfig(
+        temperature=temperature,
+        max_output_tokens=8192,
+    )
+
+def _cacheable_completion(completion):
+    # Error replies (e.g. from the Ollama branch) must be retried, never replayed
+    return isinstance(completion, str) and bool(completion) and not completion.startswith("Error:")
+
+def cached_completion(func):
+    """
+    Decorator serving query_llm-style functions (sync or async) from prompt_cache.
+    A no-op when the prompt cache is disabled.
+    """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(messages, model_name="gpt-4", temperature=0.2, **kwargs):
+            if prompt_cache is None:
+                return await func(messages, model_name, temperature, **kwargs)
+            ticket, completion = await asyncio.to_thread(prompt_cache.lookup, messages, model_name, temperature)
+            if completion is not None:
+                return completion
+            completion = await func(messages, model_name, temperature, **kwargs)
+            if _cacheable_completion(completion):
+                await asyncio.to_thread(prompt_cache.store, ticket, completion)
+            return completion
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(messages, model_name="gpt-4", temperature=0.2, **kwargs):
+        if prompt_cache is None:
+            return func(messages, model_name, temperature, **kwargs)
+        ticket, completion = prompt_cache.lookup(messages, model_name, temperature)
+        if completion is not None:
+            return completion
+        completion = func(messages, model_name, temperature, **kwargs)
+        if _cacheable_completion(completion):
+            prompt_cache.store(ticket, completion)
+        return completion
+    return wrapper
+
+@cached_completion
+def query_llm(messages, model_name="gpt-4", temperature=0.2, route=0):
     """
     Call LLM to get response results.
     
@@ -189,32 +914,25 @@ def query_llm(messages, model_name="gpt-4", temperature=0.2):
         model_name (str): LLM model name, default is "gpt-4".
                          For Ollama models, prefix with "ollama:" (e.g., "ollama:llama2")
         temperature (float): Controls the randomness of output, default is 0.2.
+        route (int): Index of the OpenAI endpoint to use (modulo the number of
+                     configured endpoints), default is 0.
 
     Returns:
         str: Response content generated by the LLM.
     """
     # Check if model is Ollama
     if model_name.lower().startswith("ollama:"):
-        # Extract the actual model name after the "ollama:" prefix
-        ollama_model = model_name.split(":", 1)[1]
-        
-        # Prepare the request payload
-        payload = {
-            "model": ollama_model,
-            "messages": messages,
-            "temperature": temperature,
-            "stream": False
-        }
-        
-        # Make the API request to Ollama
-        response = requests.post(
-            f"{ollama_api_data['base_url']}/api/chat",
-            json=payload
-        )
+        url, body = _ollama_request(messages, model_name, temperature)
+
+        # Make the API request to Ollama over the pooled session
+        try:
+            response = call_with_retries(_ollama_post, url, body)
+        except RetryableStatusError as e:
+            response = e.response
         
         # Check if the request was successful
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             return result["message"]["content"]
         else:
             error_msg = f"Ollama API error: {response.status_code} - {response.text}"
@@ -223,98 +941,193 @@ def query_llm(messages, model_name="gpt-4", temperature=0.2):
     
     # Check if model is Claude (Anthropic)
     elif model_name.lower().startswith("claude"):
-        # Convert OpenAI message format to Anthropic format
-        system_message = next((m["content"] for m in messages if m["role"] == "system"), "")
-        user_messages = [m["content"] for m in messages if m["role"] == "user"]
-        assistant_messages = [m["content"] for m in messages if m["role"] == "assistant"]
-        
-        # Combine messages into a single conversation string
-        conversation = system_message + "\n\n"
-        for user_msg, asst_msg in zip_longest(user_messages, assistant_messages, fillvalue=None):
-            if user_msg:
-                conversation += f"Human: {user_msg}\n\n"
-            if asst_msg:
-                conversation += f"Assistant: {asst_msg}\n\n"
-        
-        # Add the final user message if there is one
-        if len(user_messages) > len(assistant_messages):
-            conversation += f"Human: {user_messages[-1]}\n\n"
-
-        response = anthropic_client.messages.create(
+        system, claude_messages = _claude_request(messages)
+        response = call_with_retries(
+            get_anthropic_client().messages.create,
             model=model_name,
             max_tokens=8192,
             temperature=temperature,
-            messages=[{
-                "role": "user",
-                "content": conversation
-            }]
+            system=system,
+            messages=claude_messages
         )
         return response.content[0].text
     
     # Check if model is gemini:
     elif model_name.lower().startswith('gemini'):
-        gemini_messages = []
-        gemini_client = genai.GenerativeModel(model_name)
-        for message in messages:
-            if message["role"] == "system":
-                # Gemini doesn't have explicit system role, prepend to first user message
-                continue
-            elif message["role"] == "user":
-                gemini_messages.append({
-                    "role": "user",
-                    "parts": [message["content"]]
-                })
-            elif message["role"] == "assistant":
-                gemini_messages.append({
-                    "role": "model",
-                    "parts": [message["content"]]
-                })
-            
-        # Add system message to the first user message if exists
-        system_message = next((m["content"] for m in messages if m["role"] == "system"), "")
-        if system_message:
-            # Find the first user message and prepend system message to it
-            for msg in gemini_messages:
-                if msg["role"] == "user":
-                    msg["parts"][0] = f"{system_message}\n\n{msg['parts'][0]}"
-                    break
-            else:
-                # If no user message found, create one with just the system message
-                gemini_messages.insert(0, {
-                    "role": "user", 
-                    "parts": [system_message]
-                })
-            
-        # Generate response
-        response = gemini_client.generate_content(
-            gemini_messages,
-            generation_config=genai.types.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=8192,
-            )
-        )  
+        gemini_client = _get_gemini_client(model_name)
+        response = call_with_retries(
+            gemini_client.generate_content,
+            _gemini_messages(messages),
+            generation_config=_gemini_generation_config(temperature),
+            request_options={"timeout": llm_retry_config["timeout"]}
+        )
         return response.text
             
     else:
         # Use OpenAI API
-        response = openai_client.chat.completions.create(
+        client = openai_clients[route % len(openai_clients)]
+        response = call_with_retries(
+            client.chat.completions.create,
             model=model_name,
             messages=messages,
             temperature=temperature
         )
         return response.choices[0].message.content
 
+@cached_completion
+async def aquery_llm(messages, model_name="gpt-4", temperature=0.2):
+    """
+    Async version of query_llm, so many LLM calls can be awaited concurrently.
+
+    Args:
+        messages (list): List of conversation context.
+        model_name (str): LLM model name, default is "gpt-4".
+                         For Ollama models, prefix with "ollama:" (e.g., "ollama:llama2")
+        temperature (float): Controls the randomness of output, default is 0.2.
+
+    Returns:
+        str: Response content generated by the LLM.
+    """
+    if model_name.lower().startswith("ollama:"):
+        # The Ollama branch uses the pooled requests session, run it off the event loop
+        # (bypassing its cache layer, this call is already cached)
+        return await asyncio.to_thread(query_llm.__wrapped__, messages, model_name, temperature)
+
+    elif model_name.lower().startswith("claude"):
+        system, claude_messages = _claude_request(messages)
+        response = await acall_with_retries(
+            get_async_anthropic_client().messages.create,
+            model=model_name,
+            max_tokens=8192,
+            temperature=temperature,
+            system=system,
+            messages=claude_messages
+        )
+        return response.content[0].text
+
+    elif model_name.lower().startswith('gemini'):
+        gemini_client = _get_gemini_client(model_name)
+        response = await acall_with_retries(
+            gemini_client.generate_content_async,
+            _gemini_messages(messages),
+            generation_config=_gemini_generation_config(temperature),
+            request_options={"timeout": llm_retry_config["timeout"]}
+        )
+        return response.text
+
+    else:
+        response = await acall_with_retries(
+            get_async_openai_client().chat.completions.create,
+            model=model_name,
+            messages=messages,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+def cached_result(agent):
+    """
+    Decorator serving an agent's (success, result) from result_cache. Only
+    successful runs are stored; pass use_cache=False to force a fresh run.
+    """
+    @functools.wraps(agent)
+    def wrapper(user_question, model_name="gpt-4", max_attempts=3, use_cache=True):
+        if result_cache is None or not use_cache:
+            return agent(user_question, model_name, max_attempts)
+        key = hashlib.sha256(f"{agent.__name__}|{model_name}|{user_question}".encode("utf-8")).hexdigest()
+        cached = result_cache.get(key)
+        if cached is not None:
+            success, result = json.loads(cached)
+            print(f"[Cached result]: {success}, {result}")
+            return success, result
+        success, result = agent(user_question, model_name, max_attempts)
+        if success:
+            result_cache.set(key, json.dumps([success, result]))
+        return success, result
+    return wrapper
+
+def _solve_with_candidates(messages, model_name, temperatures):
+    """
+    Sample one code candidate per temperature concurrently and execute each as
+    soon as it arrives, stopping at the first that runs successfully.
+
+    Args:
+        messages (list): Conversation ending with the code generation request.
+        model_name (str): LLM model name to use.
+        temperatures (list): One sampling temperature per candidate.
+
+    Returns:
+        tuple: (success, best objective or error message, code) of the first
+        successful candidate, or of the first (lowest index) candidate if none succeeds.
+    """
+    solved = threading.Event()
+    running = _ProcessGroup()
+
+    def candidate(index, temperature):
+        # Each candidate's output is captured separately and replayed only for the chosen one
+        output = io.StringIO()
+        with capture_stdout(output):
+            code = query_llm(messages, model_name, temperature, route=index)
+            print(f"[Python Gurobi Code, candidate {index + 1} (temperature {temperature})]:\n", code)
+            if solved.is_set():
+                return False, "Skipped: another candidate already succeeded", code, output.getvalue()
+            token = _process_group.set(running)
+            try:
+                success, result = extract_and_execute_python_code(code)
+            finally:
+                _process_group.reset(token)
+        if success:
+            solved.set()
+        return success, result, code, output.getvalue()
+
+    executor = ThreadPoolExecutor(max_workers=len(temperatures), thread_name_prefix="or_candidate")
+    futures = {executor.submit(candidate, i, t): i for i, t in enumerate(temperatures)}
+    outcomes = {}
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                outcomes[index] = future.result()
+            except Exception as e:
+                outcomes[index] = e
+                continue
+            if outcomes[index][0]:
+                break
+    finally:
+        # Candidates still waiting on the LLM finish in the background and skip execution,
+        # the ones already executing are killed instead of running until the timeout
+        solved.set()
+        running.kill_all()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    winner = next((i for i, o in outcomes.items() if not isinstance(o, Exception) and o[0]), 0)
+    outcome = outcomes[winner]
+    if isinstance(outcome, Exception):
+        raise outcome
+    success, result, code, output = outcome
+    print(output, end="")
+    return success, result, code
+
 def generate_or_code_solver(messages_bak, model_name, max_attempts):
-    messages = copy.deepcopy(messages_bak)
+    messages = [m.copy() for m in messages_bak]
 
-    gurobi_code = query_llm(messages, model_name)
-    print("[Python Gurobi Code]:\n", gurobi_code)
+    temperatures = code_exec_config["candidate_temperatures"]
+    executed = None  # (success, result) when the first code was already executed
+    if len(temperatures) > 1:
+        success, error_msg, gurobi_code = _solve_with_candidates(messages, model_name, temperatures)
+        executed = (success, error_msg)
+    else:
+        gurobi_code = query_llm(messages, model_name, *temperatures)
+        print("[Python Gurobi Code]:\n", gurobi_code)
 
     # 4. Code execution & fixes
     text = f"{gurobi_code}"
     attempt = 0
     while attempt < max_attempts:
-        success, error_msg = extract_and_execute_python_code(text)
+        if executed is not None:
+            success, error_msg = executed
+            executed = None
+        else:
+            success, error_msg = extract_and_execute_python_code(text)
         if success:
             messages_bak.append({"role": "assistant", "content": gurobi_code})
             return True, error_msg, messages_bak
@@ -336,6 +1149,77 @@ def generate_or_code_solver(messages_bak, model_name, max_attempts):
     print(f"Reached maximum number of attempts ({max_attempts}), could not execute code successfully.")
     return False, None, messages_bak
 
+# Prompts are module-level constants, so every run sends byte-for-byte identical prefixes (provider prefix caching)
+_SYSTEM_MATH_MODEL: Final[str] = (
+    "You are an operations research expert. Based on the optimization problem "
+    "provided by the user, construct a mathematical model that effectively "
+    "models the original problem using mathematical (linear programming) expressions.\n\n"
+    "Follow these steps:\n"
+    "1. Identify the decision variables and clearly define what each variable represents\n"
+    "2. Formulate the objective function (min or max)\n"
+    "3. List all constraints with clear mathematical expressions\n"
+    "4. Specify any bounds or restrictions on variables\n\n"
+    "Focus on obtaining a correct mathematical model expression without too "
+    "much concern for explanations. This model will be used later to guide "
+    "the generation of Gurobi code, and this step is mainly used to generate "
+    "effective linear scale expressions."
+)
+
+_USER_VALIDATE: Final[str] = (
+    "Please verify whether the above mathematical model correctly and completely "
+    "represents the original problem stated earlier in natural language.\n\n"
+    "Specifically:\n"
+    "1. **Check correctness** of the objective function, constraints, variables, and sets.\n"
+    "2. **Identify and fix any errors, omissions, or misinterpretations** from the original problem.\n"
+    "3. If the model is already correct, check if it can be **simplified or written more concisely**.\n"
+    "4. Finally, output the **corrected or optimized mathematical model** in full.\n\n"
+    "Be precise, and think like a mathematical model auditor or a reviewer."
+)
+
+_USER_GEN_CODE: Final[str] = (
+    "Based on the above mathematical model, write complete and reliable Python code using Gurobi to solve "
+    "this operations research optimization problem.\n\n"
+    "Your code must follow this structure:\n"
+    "1. Import necessary libraries (gurobipy, numpy, etc.)\n"
+    "2. Create a model instance\n"
+    "3. Define and add variables with appropriate bounds\n"
+    "4. Set the objective function\n"
+    "5. Add all constraints\n"
+    "6. Optimize the model\n"
+    "7. Extract and print the results, including the optimal objective value\n"
+    "8. Handle potential infeasibility or unboundedness\n\n"
+    "Output in the format ```python\n{code}\n```, without code explanations."
+)
+
+_USER_INFEASIBLE: Final[str] = (
+    "The current model resulted in *no feasible solution*. This indicates one of these issues:\n"
+    "1. Contradictory constraints making the problem infeasible\n"
+    "2. Incorrect variable bounds\n"
+    "3. Errors in constraint formulation\n\n"
+    "Please carefully analyze the mathematical model and Gurobi code. Add diagnostic code to identify "
+    "which constraints are causing infeasibility. Then fix the issues and provide the complete corrected code.\n\n"
+    "Output in the format ```python\n{code}\n```, without code explanations."
+)
+
+_USER_MAX_RETRY: Final[str] = (
+    "The model code still reports errors after multiple debugging attempts. Here are common issues to address:\n"
+    "1. Check for syntax errors or undefined variables\n"
+    "2. Ensure all constraints use proper Gurobi syntax (e.g., model.addConstr() not just expressions)\n"
+    "3. Verify that all mathematical operations are valid (e.g., no division by zero)\n"
+    "4. Confirm that variable types match their usage (continuous vs. integer vs. binary)\n\n"
+    "Please completely rebuild the Gurobi Python code with careful attention to these details.\n"
+    "Output in the format ```python\n{code}\n```, without code explanations."
+)
+
+_SYSTEM_CODE_AGENT: Final[str] = (
+    "You are an operations research expert. Based on the optimization problem provided by the user, construct a mathematical "
+    "model and write complete, reliable Python code using Gurobi to solve the operations research optimization problem."
+    "The code should include necessary model construction, variable definitions, constraint additions, objective function "
+    "settings, as well as solving and result output."
+    "Output in the format ```python\n{code}\n```, without code explanations."
+)
+
+@cached_result
 def or_llm_agent(user_question, model_name="gpt-4", max_attempts=3):
     """
     Request Gurobi code solution from LLM and execute it, attempt to fix if it fails.
@@ -344,6 +1228,7 @@ def or_llm_agent(user_question, model_name="gpt-4", max_attempts=3):
         user_question (str): User's problem description.
         model_name (str): LLM model name to use, default is "gpt-4".
         max_attempts (int): Maximum number of attempts, default is 3.
+        use_cache (bool): Reuse the stored result of an earlier successful run, default is True.
 
     Returns:
         tuple: (success: bool, best_objective: float or None, final_code: str)
@@ -352,20 +1237,7 @@ def or_llm_agent(user_question, model_name="gpt-4", max_attempts=3):
     messages = [
         {
             "role": "system",
-            "content": (
-                "You are an operations research expert. Based on the optimization problem "
-                "provided by the user, construct a mathematical model that effectively "
-                "models the original problem using mathematical (linear programming) expressions.\n\n"
-                "Follow these steps:\n"
-                "1. Identify the decision variables and clearly define what each variable represents\n"
-                "2. Formulate the objective function (min or max)\n"
-                "3. List all constraints with clear mathematical expressions\n"
-                "4. Specify any bounds or restrictions on variables\n\n"
-                "Focus on obtaining a correct mathematical model expression without too "
-                "much concern for explanations. This model will be used later to guide "
-                "the generation of Gurobi code, and this step is mainly used to generate "
-                "effective linear scale expressions."
-            )
+            "content": _SYSTEM_MATH_MODEL
         },
         {
             "role": "user",
@@ -389,16 +1261,7 @@ def or_llm_agent(user_question, model_name="gpt-4", max_attempts=3):
     messages.append(
         {
             "role": "user",
-            "content": (
-                "Please verify whether the above mathematical model correctly and completely "
-                "represents the original problem stated earlier in natural language.\n\n"
-                "Specifically:\n"
-                "1. **Check correctness** of the objective function, constraints, variables, and sets.\n"
-                "2. **Identify and fix any errors, omissions, or misinterpretations** from the original problem.\n"
-                "3. If the model is already correct, check if it can be **simplified or written more concisely**.\n"
-                "4. Finally, output the **corrected or optimized mathematical model** in full.\n\n"
-                "Be precise, and think like a mathematical model auditor or a reviewer."
-            )
+            "content": _USER_VALIDATE
         }
     )
 
@@ -418,20 +1281,7 @@ def or_llm_agent(user_question, model_name="gpt-4", max_attempts=3):
     messages.append(
         {
             "role": "user",
-            "content": (
-                "Based on the above mathematical model, write complete and reliable Python code using Gurobi to solve "
-                "this operations research optimization problem.\n\n"
-                "Your code must follow this structure:\n"
-                "1. Import necessary libraries (gurobipy, numpy, etc.)\n"
-                "2. Create a model instance\n"
-                "3. Define and add variables with appropriate bounds\n"
-                "4. Set the objective function\n"
-                "5. Add all constraints\n"
-                "6. Optimize the model\n"
-                "7. Extract and print the results, including the optimal objective value\n"
-                "8. Handle potential infeasibility or unboundedness\n\n"
-                "Output in the format ```python\n{code}\n```, without code explanations."
-            )
+            "content": _USER_GEN_CODE
         }
     )
 
@@ -448,15 +1298,7 @@ def or_llm_agent(user_question, model_name="gpt-4", max_attempts=3):
             messages.append(
                 {
                     "role": "user",
-                    "content": (
-                        "The current model resulted in *no feasible solution*. This indicates one of these issues:\n"
-                        "1. Contradictory constraints making the problem infeasible\n"
-                        "2. Incorrect variable bounds\n"
-                        "3. Errors in constraint formulation\n\n"
-                        "Please carefully analyze the mathematical model and Gurobi code. Add diagnostic code to identify "
-                        "which constraints are causing infeasibility. Then fix the issues and provide the complete corrected code.\n\n"
-                        "Output in the format ```python\n{code}\n```, without code explanations."
-                    )
+                    "content": _USER_INFEASIBLE
                 }
             )
             is_solve_success, result, messages = generate_or_code_solver(messages, model_name, max_attempts=1)
@@ -466,20 +1308,13 @@ def or_llm_agent(user_question, model_name="gpt-4", max_attempts=3):
             messages.append(
                 {
                     "role": "user",
-                    "content": (
-                        "The model code still reports errors after multiple debugging attempts. Here are common issues to address:\n"
-                        "1. Check for syntax errors or undefined variables\n"
-                        "2. Ensure all constraints use proper Gurobi syntax (e.g., model.addConstr() not just expressions)\n"
-                        "3. Verify that all mathematical operations are valid (e.g., no division by zero)\n"
-                        "4. Confirm that variable types match their usage (continuous vs. integer vs. binary)\n\n"
-                        "Please completely rebuild the Gurobi Python code with careful attention to these details.\n"
-                        "Output in the format ```python\n{code}\n```, without code explanations."
-                    )
+                    "content": _USER_MAX_RETRY
                 }
             )
             is_solve_success, result, messages = generate_or_code_solver(messages, model_name, max_attempts=2)
 
     return is_solve_success, result
+@cached_result
 def gpt_code_agent_simple(user_question, model_name="gpt-4", max_attempts=3):
     """
     Request Gurobi code solution from LLM and execute it, attempt to fix if it fails.
@@ -488,6 +1323,7 @@ def gpt_code_agent_simple(user_question, model_name="gpt-4", max_attempts=3):
         user_question (str): User's problem description.
         model_name (str): LLM model name to use, default is "gpt-4".
         max_attempts (int): Maximum number of attempts, default is 3.
+        use_cache (bool): Reuse the stored result of an earlier successful run, default is True.
 
     Returns:
         tuple: (success: bool, best_objective: float or None, final_code: str)
@@ -496,13 +1332,7 @@ def gpt_code_agent_simple(user_question, model_name="gpt-4", max_attempts=3):
     messages = [
         {
             "role": "system", 
-            "content": (
-                "You are an operations research expert. Based on the optimization problem provided by the user, construct a mathematical "
-                "model and write complete, reliable Python code using Gurobi to solve the operations research optimization problem."
-                "The code should include necessary model construction, variable definitions, constraint additions, objective function "
-                "settings, as well as solving and result output."
-                "Output in the format ```python\n{code}\n```, without code explanations."
-            )
+            "content": _SYSTEM_CODE_AGENT
         },
         {
             "role": "user",
@@ -518,4 +1348,63 @@ def gpt_code_agent_simple(user_question, model_name="gpt-4", max_attempts=3):
     
     print(f'Stage result: {is_solve_success}, {result}')
     
-    return is_solve_success, result
\ No newline at end of file
+    return is_solve_success, result
+
+async def gpt_code_agent_simple_async(user_question, model_name="gpt-4", max_attempts=3):
+    """
+    Async version of gpt_code_agent_simple: the LLM call is awaited and the
+    generated code is executed in a worker thread.
+
+    Args:
+        user_question (str): User's problem description.
+        model_name (str): LLM model name to use, default is "gpt-4".
+        max_attempts (int): Maximum number of attempts, default is 3.
+
+    Returns:
+        tuple: (success: bool, best_objective: float or None)
+    """
+    messages = [
+        {
+            "role": "system",
+            "content": _SYSTEM_CODE_AGENT
+        },
+        {
+            "role": "user",
+            "content": user_question
+        }
+    ]
+
+    gurobi_code = await aquery_llm(messages, model_name)
+    print("[Python Gurobi Code]:\n", gurobi_code)
+    is_solve_success, result = await asyncio.to_thread(extract_and_execute_python_code, gurobi_code)
+
+    print(f'Stage result: {is_solve_success}, {result}')
+
+    return is_solve_success, result
+
+async def or_llm_agent_batch(questions, model_name="gpt-4", max_attempts=3, max_concurrency=8, agent=None):
+    """
+    Solve many problems concurrently, at most max_concurrency at a time.
+
+    Args:
+        questions (list): Problem descriptions.
+        model_name (str): LLM model name to use, default is "gpt-4".
+        max_attempts (int): Maximum number of attempts per problem, default is 3.
+        max_concurrency (int): Maximum number of problems in flight, default is 8.
+        agent: Agent to run, or_llm_agent (default) or gpt_code_agent_simple;
+               coroutine functions such as gpt_code_agent_simple_async are awaited directly.
+
+    Returns:
+        list: (success, result) tuples in the order of questions.
+    """
+    agent = agent or or_llm_agent
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def solve(question):
+        async with semaphore:
+            if asyncio.iscoroutinefunction(agent):
+                return await agent(question, model_name, max_attempts)
+            return await asyncio.to_thread(agent, question, model_name, max_attempts)
+
+    async with async_llm_clients():
+        return await asyncio.gather(*(solve(question) for question in questions))